@@ -10,12 +10,22 @@ class BA1(sm.SM):
 		else:
 			newState = state * 1.02
 		return newState, newState # s, o
+	def getNextValuesBatch(self, states, inputs):
+		newStates = [state * 1.02 + inp - 100 if inp != 0 else state * 1.02
+					 for (state, inp) in zip(states, inputs)]
+		return newStates, newStates
 
 class BA2(sm.SM):
 	startState = 0
 	def getNextValues(self, state, inp):
 		newState = state * 1.01 + inp
 		return newState, newState # s, o
+	def getNextValuesBatch(self, states, inputs):
+		newStates = [state * 1.01 + inp for (state, inp) in zip(states, inputs)]
+		return newStates, newStates
+	def lti(self):
+		# y[n] = 1.01 y[n - 1] + x[n], the same sum in the same order
+		return sm.LTISM([1], [1.01], previousOutputs = [self.startState])
 
 """
 Maximize machine
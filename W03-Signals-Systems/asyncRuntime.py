@@ -0,0 +1,262 @@
+"""
+Runs a state machine brain with asyncio instead of having the simulator call
+step, which reads the sensors and executes the action inline. The sensors are
+read in the background, so a slow read doesn't hold up the control loop: each
+step uses the latest reading there is. The machine is stepped at a fixed
+rate, and the runtime records how late each step starts (jitter) and which
+steps take longer than the period (overruns).
+
+A simulated robot next to a wall stands in for the real one, so brains can be
+run offline; its readings have a sonars list like io.SensorInput's, and it
+takes actions with fvel and rvel like io.Action's.
+"""
+import asyncio
+import math
+import random
+import time
+import statemachine as sm
+
+class Summary:
+    """
+    The count, total and maximum of a series of values, kept as they are
+    added so that a long run doesn't keep every value
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = value if self.count == 1 else max(self.max, value)
+
+    def toDict(self):
+        if self.count == 0:
+            return {'mean': 0, 'max': 0}
+        return {'mean': self.total / self.count, 'max': self.max}
+
+class LoopStats:
+    """
+    Timing of the steps of an AsyncRunner
+
+    Attributes:
+        steps (int): the number of steps taken
+        overruns (int): the number of steps which weren't finished by the
+            time the next one was due
+        missed (int): the number of ticks skipped because of overruns
+        stale (int): the number of steps which had no new sensor reading and
+            used the one before again
+        jitter (Summary): how many seconds late each step started
+        stepTimes (Summary): how many seconds each step took, from reading
+            the input to applying the output
+    """
+    def __init__(self):
+        self.steps = 0
+        self.overruns = 0
+        self.missed = 0
+        self.stale = 0
+        self.jitter = Summary()
+        self.stepTimes = Summary()
+
+    def toDict(self):
+        return {'steps': self.steps,
+                'overruns': self.overruns,
+                'missed': self.missed,
+                'stale': self.stale,
+                'jitter': self.jitter.toDict(),
+                'stepTime': self.stepTimes.toDict()}
+
+class AsyncRunner:
+    """
+    Steps a state machine at a fixed rate, with inputs from an async source
+    and outputs sent to an async sink
+
+    Attributes:
+        machine: the state machine, which only needs start and step
+        source: an async function returning the next input
+        sink: an async function taking each output, or None
+        period (float): the seconds between steps
+        stats (LoopStats): the timing of the last run
+    """
+    def __init__(self, machine, source, sink = None, period = 0.1):
+        self.machine = machine
+        self.source = source
+        self.sink = sink
+        self.period = period
+        self.stats = LoopStats()
+        self.reading = None
+        self.fresh = False
+        self.first = None
+
+    async def readForever(self):
+        """Keeps self.reading up to date with the source, in the background"""
+        while True:
+            self.reading = await self.source()
+            self.fresh = True
+            self.first.set()
+            # Lets the control loop run even if the source never suspends
+            await asyncio.sleep(0)
+
+    def checkReader(self, reader):
+        """Raises the source's exception if it has failed"""
+        if reader.done():
+            reader.result()
+
+    async def run(self, steps = None, done = None):
+        """
+        Steps the machine until it has taken steps steps, or done (a function
+        of the output) returns True, and returns the outputs
+
+        The first step waits for the first reading; after that a step never
+        waits for the source. If the source raises an exception, run stops
+        at the next tick and raises it too.
+        """
+        loop = asyncio.get_running_loop()
+        self.stats = LoopStats()
+        self.machine.start()
+        (self.reading, self.fresh) = (None, False)
+        self.first = asyncio.Event()
+        reader = asyncio.ensure_future(self.readForever())
+        outputs = []
+        try:
+            # Waits for the first reading, or for the source to fail first
+            waiter = asyncio.ensure_future(self.first.wait())
+            await asyncio.wait([waiter, reader],
+                               return_when = asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            self.checkReader(reader)
+            due = loop.time()
+            while steps == None or self.stats.steps < steps:
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.checkReader(reader)
+                start = loop.time()
+                self.stats.jitter.add(start - due)
+                if not self.fresh:
+                    self.stats.stale += 1
+                self.fresh = False
+                o = self.machine.step(self.reading)
+                if self.sink != None:
+                    await self.sink(o)
+                outputs.append(o)
+                end = loop.time()
+                self.stats.steps += 1
+                self.stats.stepTimes.add(end - start)
+                due += self.period
+                if end > due:
+                    # Skips the ticks that have already gone by
+                    self.stats.overruns += 1
+                    missed = math.ceil((end - due) / self.period)
+                    self.stats.missed += missed
+                    due += missed * self.period
+                if done != None and done(o):
+                    break
+        finally:
+            reader.cancel()
+        return outputs
+
+class SensorReading:
+    """A reading from the simulated robot, like io.SensorInput"""
+    def __init__(self, sonars, odometry):
+        self.sonars = sonars
+        self.odometry = odometry
+
+class Action:
+    """An action for the simulated robot, like io.Action"""
+    def __init__(self, fvel = 0.0, rvel = 0.0):
+        self.fvel = fvel
+        self.rvel = rvel
+
+class SimulatedRobot:
+    """
+    A robot driving along a wall on its right, with eight sonars of which
+    sonars[7] points right, at the wall, as on the real robot. Its
+    pose is (distance from the wall, distance along it, heading), with the
+    heading measured anticlockwise from the direction of the wall.
+
+    Attributes:
+        latency (float): the seconds each sensor read takes
+        slowEvery (int): every slowEvery-th read takes slowLatency seconds
+            instead, or None
+    """
+    def __init__(self, distance = 0.6, heading = 0.0, noise = 0.01,
+                 latency = 0.005, slowEvery = None, slowLatency = 0.3,
+                 seed = 0):
+        self.distance = distance
+        self.along = 0.0
+        self.heading = heading
+        self.noise = noise
+        self.latency = latency
+        self.slowEvery = slowEvery
+        self.slowLatency = slowLatency
+        self.rng = random.Random(seed)
+        self.reads = 0
+        self.action = Action()
+        self.time = None
+
+    def move(self):
+        """Moves the robot with its last action for the time since it moved"""
+        now = time.perf_counter()
+        if self.time != None:
+            dt = now - self.time
+            self.heading += self.action.rvel * dt
+            self.distance += self.action.fvel * math.sin(self.heading) * dt
+            self.along += self.action.fvel * math.cos(self.heading) * dt
+        self.time = now
+
+    async def read(self):
+        self.reads += 1
+        if self.slowEvery != None and self.reads % self.slowEvery == 0:
+            await asyncio.sleep(self.slowLatency)
+        else:
+            await asyncio.sleep(self.latency)
+        self.move()
+        sonars = [5.0] * 8
+        # The right sonar sees the wall further away when the robot is
+        # turned from it
+        sonars[7] = (self.distance / max(math.cos(self.heading), 0.1) +
+                     self.rng.gauss(0, self.noise))
+        return SensorReading(sonars, (self.along, self.distance, self.heading))
+
+    async def execute(self, action):
+        self.move()
+        self.action = action
+
+class RightDistance(sm.SM):
+    """Reads the distance to the wall on the right from the sonars"""
+    startState = None
+    def getNextValues(self, state, inp):
+        return state, inp.sonars[7]
+
+class WallFollower(sm.SM):
+    """
+    The delay-plus-proportional controller from week 6, which steers by the
+    current and previous distances to the wall
+    """
+    def __init__(self, desiredRight = 0.4, forwardVelocity = 0.1, k1 = 10,
+                 k2 = -9.7):
+        self.desiredRight = desiredRight
+        self.forwardVelocity = forwardVelocity
+        (self.k1, self.k2) = (k1, k2)
+        self.startState = 0
+    def getNextValues(self, state, inp):
+        error = self.desiredRight - inp
+        return error, Action(self.forwardVelocity,
+                             self.k1 * error + self.k2 * state)
+
+def demo(steps = 100, period = 0.05, slowEvery = 10):
+    """
+    Follows the wall with the simulated robot, with every slowEvery-th
+    sensor read taking longer than several periods, and prints the timing
+    """
+    robot = SimulatedRobot(slowEvery = slowEvery)
+    brain = sm.Cascade(RightDistance(), WallFollower())
+    runner = AsyncRunner(brain, robot.read, robot.execute, period)
+    asyncio.run(runner.run(steps))
+    print('final distance from wall %.3f' % robot.distance)
+    print(runner.stats.toDict())
+
+if __name__ == '__main__':
+    demo()
@@ -0,0 +1,76 @@
+"""
+Runs one state machine over many independent input streams at once, e.g. the
+same bank account machine for thousands of customers, each with their own
+deposits.
+"""
+
+class BatchRunner:
+    """
+    Holds the states of n copies of a machine, kept by startStateBatch as one
+    batch per part of the machine, and steps every copy once per call to step
+
+    Attributes:
+        machine: the state machine
+        n (int): the number of copies
+        states: the batch of states from the machine's startStateBatch
+    """
+    def __init__(self, machine, n):
+        self.machine = machine
+        self.n = n
+        self.start()
+
+    def start(self):
+        self.states = self.machine.startStateBatch(self.n)
+
+    def step(self, inputs):
+        """
+        Takes a list of n inputs, one for each copy, and returns the list of
+        their n outputs
+        """
+        self.states, outputs = self.machine.getNextValuesBatch(self.states,
+                                                               inputs)
+        return outputs
+
+    def transduce(self, streams):
+        """
+        Returns the outputs for each of n input streams, all of the same
+        length, as a list of n lists, the same as calling transduce on the
+        machine once for each stream
+        """
+        self.start()
+        # One list of outputs for each time step, turned back into streams
+        steps = [self.step(inputs) for inputs in zip(*streams)]
+        if len(steps) == 0:
+            return [[] for stream in streams]
+        return [list(outputs) for outputs in zip(*steps)]
+
+    def instanceStates(self):
+        """The state of each copy, as getNextValues would see it"""
+        return self.machine.unbatchStates(self.states)
+
+def transduceShard(args):
+    (machine, streams) = args
+    return BatchRunner(machine, len(streams)).transduce(streams)
+
+def transduceSharded(machine, streams, pool, shards = 16):
+    """
+    Splits the streams into shards and runs a BatchRunner over each one in a
+    multiprocessing pool, for machines whose getNextValuesBatch just steps
+    each copy in turn. The machine is pickled and sent to each worker, so it
+    has to be defined at the top level of a module (no lambdas).
+
+    Args:
+        pool: a multiprocessing.Pool or anything else with a map method
+        shards (int): the number of shards, which should be a few times the
+            number of workers so they finish at about the same time
+
+    Returns:
+        the outputs for each stream, as from BatchRunner.transduce
+    """
+    size = max(1, -(-len(streams) // shards))
+    parts = [(machine, streams[i:i + size])
+             for i in range(0, len(streams), size)]
+    outputs = []
+    for part in pool.map(transduceShard, parts):
+        outputs.extend(part)
+    return outputs
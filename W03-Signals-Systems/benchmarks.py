@@ -0,0 +1,263 @@
+"""
+Benchmarks for the state machine framework from this week. Running this file
+prints the results of all of them.
+"""
+import multiprocessing
+import random
+import time
+import tracemalloc
+import statemachine as sm
+import smCompiler
+import batch
+import smTracer
+import accounts
+import sequential
+import vending
+
+def timed(f, *args, **kwargs):
+    """Returns the result of calling f and the number of seconds it took"""
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def deposits(n):
+    """A list of n random deposits and withdrawals, always the same"""
+    rng = random.Random(0)
+    return [rng.choice([0, 100, -50, 1000, 4000, -3500]) for i in range(n)]
+
+def benchmarkBlockTransduce(lengths = (10000, 100000, 1000000)):
+    """
+    Times transduce against transduceBlock on composite machines built from
+    the combinators with block implementations, for long input sequences
+    """
+    machines = [('maxAccount', sm.Cascade(sm.Parallel(accounts.BA1(),
+                                                      accounts.BA2()),
+                                          sm.PureFunction(max))),
+                ('delay chain', sm.Cascade(sm.Cascade(sm.Delay(0),
+                                                      sm.Increment(1)),
+                                           sm.ParallelAdd(sm.Delay(0),
+                                                          sm.Increment(2))))]
+    for n in lengths:
+        inputs = deposits(n)
+        for (name, m) in machines:
+            (outputs, t) = timed(m.transduce, inputs)
+            (blockOutputs, tBlock) = timed(m.transduceBlock, inputs)
+            assert blockOutputs == outputs
+            print('%s n=%d: transduce %.3fs, transduceBlock %.3fs (%.1fx)' %
+                  (name, n, t, tBlock, t / tBlock))
+
+def peakMemory(f, *args):
+    """Returns the result of calling f and the peak memory it used, in bytes"""
+    tracemalloc.start()
+    result = f(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+def benchmarkStreaming(lengths = (10000, 100000, 1000000)):
+    """
+    Compares the peak memory and time taken by transduce and transduceIter to
+    sum the outputs of a bank account machine over a long stream of deposits,
+    which transduceIter reads from a generator as it goes
+    """
+    def stream(n):
+        rng = random.Random(0)
+        return (rng.choice([0, 100, -50, 1000]) for i in range(n))
+    for n in lengths:
+        m = accounts.BA2()
+        start = time.perf_counter()
+        (total, peak) = peakMemory(lambda: sum(m.transduce(list(stream(n)))))
+        t = time.perf_counter() - start
+        print('transduce n=%d: peak %.1f KB, %.3fs' % (n, peak / 1024, t))
+        start = time.perf_counter()
+        (iterTotal, peak) = peakMemory(lambda: sum(m.transduceIter(stream(n))))
+        t = time.perf_counter() - start
+        assert iterTotal == total
+        print('transduceIter n=%d: peak %.1f KB, %.3fs' % (n, peak / 1024, t))
+
+def benchmarkCompiled(n = 1000000):
+    """
+    Times transduce on composite machines against the same machines compiled
+    by smCompiler into a single step function, and checks that they give the
+    same outputs; terminating machines, like the ones in sequential.py, also
+    have to stop after the same number of steps
+    """
+    inputs = deposits(n)
+    machines = [('BA2', accounts.BA2()),
+                ('maxAccount', accounts.maxAccount),
+                ('switchAccount', accounts.switchAccount),
+                ('accumulator', sm.FeedbackAdd(sm.Delay(0),
+                                               sm.PureFunction(lambda x: x))),
+                ('delay chain', sm.Cascade(sm.Cascade(sm.Delay(0),
+                                                      sm.Increment(1)),
+                                           sm.ParallelAdd(sm.Delay(0),
+                                                          sm.Increment(2)))),
+                ('SumTSM', sequential.a),
+                ('Repeat(SumTSM, 4)', sequential.fourTimes),
+                ('CountUpTo(3)', sequential.m),
+                ('negate', sequential.negate),
+                ('alternating', sequential.alternating)]
+    for (name, m) in machines:
+        (outputs, t) = timed(m.transduce, inputs)
+        (compiled, tCompile) = timed(smCompiler.CompiledSM, m)
+        (compiledOutputs, tCompiled) = timed(compiled.transduce, inputs)
+        assert compiledOutputs == outputs
+        if hasattr(m, 'done'):
+            assert list(compiled.transduceIter(inputs)) == \
+                list(m.transduceIter(inputs))
+        print('%s n=%d: transduce %.3fs, compiled %.3fs (%.1fx), '
+              'compiling %.4fs' % (name, n, t, tCompiled, t / tCompiled,
+                                   tCompile))
+
+class OpaqueDelay(sm.SM):
+    """
+    A Delay without a getOutput method, so feedback loops around it have to
+    step their machines twice
+    """
+    def __init__(self, v0):
+        self.startState = v0
+    def getNextValues(self, state, inp):
+        return inp, state
+
+def accumulator(init, delay = sm.Delay):
+    """
+    The accumulator from composition.py in week 4, y[n] = y[n - 1] + x[n],
+    built from this week's machines
+    """
+    return sm.FeedbackAdd(sm.PureFunction(lambda x: x), delay(init))
+
+def nestedAccumulator(depth, delay = sm.Delay):
+    """depth feedback loops nested inside each other around an accumulator"""
+    m = accumulator(0, delay)
+    for i in range(depth - 1):
+        m = sm.FeedbackAdd(m, delay(0))
+    return m
+
+def benchmarkNestedFeedback(depths = (1, 2, 4, 8, 12), n = 1000):
+    """
+    Times nested feedback accumulators with Delay, which the feedback
+    combinators step once per step, against the same machines with a delay
+    they have to step twice, doubling the work at every level of nesting
+    """
+    inputs = deposits(n)
+    for depth in depths:
+        (outputs, t) = timed(nestedAccumulator(depth).transduce, inputs)
+        (opaqueOutputs, tOpaque) = timed(
+            nestedAccumulator(depth, OpaqueDelay).transduce, inputs)
+        assert opaqueOutputs == outputs
+        print('depth %d n=%d: single evaluation %.3fs, double evaluation '
+              '%.3fs (%.1fx)' % (depth, n, t, tOpaque, tOpaque / t))
+
+def benchmarkCheckpoints(n = 1000000, everys = (1000, 10000, 100000)):
+    """
+    Times transduceCheckpointed on switchAccount against transduce, shows the
+    size of its snapshots, and checks that resuming from the middle snapshot
+    gives the same outputs as the uninterrupted run, that the last snapshot
+    is taken after the last input, and that a snapshot can't be restored
+    into a machine with a different structure
+    """
+    inputs = deposits(n)
+    m = accounts.switchAccount
+    (outputs, t) = timed(m.transduce, inputs)
+    print('transduce n=%d: %.3fs' % (n, t))
+    for every in everys:
+        snapshots = []
+        (checkpointed, tCheckpointed) = timed(m.transduceCheckpointed, inputs,
+                                              snapshots.append, every)
+        assert checkpointed == outputs
+        middle = snapshots[len(snapshots) // 2]
+        resumed = m.transduceCheckpointed(inputs, lambda snapshot: None,
+                                          every, middle)
+        assert resumed == outputs[m.restore(middle):]
+        assert m.restore(snapshots[-1]) == n
+        print('checkpoint every %d: %.3fs, %d snapshots of %d bytes' %
+              (every, tCheckpointed, len(snapshots), len(middle)))
+    # The same top-level class, with different machines inside it
+    other = sm.Cascade(sm.Delay(0), sm.Gain(1))
+    try:
+        other.restore(m.snapshot(n))
+        restored = True
+    except Exception:
+        restored = False
+    assert not restored, 'Restored a snapshot of a different machine'
+
+def customers(n, length, choices, seed = 0):
+    """n input streams of the given length, one for each customer"""
+    rng = random.Random(seed)
+    return [[rng.choice(choices) for t in range(length)] for i in range(n)]
+
+def benchmarkBatch(n = 5000, length = 200, processes = (1, 2, 4)):
+    """
+    Times running a machine for n customers one at a time against a
+    BatchRunner stepping all of them together, and for Vending, whose
+    getNextValuesBatch doesn't do anything faster, sharded over a pool
+    """
+    streams = customers(n, length, [0, 100, -50, 1000, 4000, -3500])
+    for (name, m) in [('BA1', accounts.BA1()), ('BA2', accounts.BA2()),
+                      ('maxAccount', accounts.maxAccount)]:
+        (outputs, t) = timed(lambda: [m.transduce(s) for s in streams])
+        (batchOutputs, tBatch) = timed(batch.BatchRunner(m, n).transduce,
+                                       streams)
+        assert batchOutputs == outputs
+        print('%s %d customers x %d: one at a time %.3fs, batched %.3fs '
+              '(%.1fx)' % (name, n, length, t, tBatch, t / tBatch))
+    streams = customers(n, length, ['quarter', 'cancel', 'dispense'])
+    m = vending.Vending()
+    (outputs, t) = timed(lambda: [m.transduce(s) for s in streams])
+    print('Vending %d customers x %d: one at a time %.3fs' % (n, length, t))
+    for p in processes:
+        with multiprocessing.Pool(p) as pool:
+            (shardedOutputs, tSharded) = timed(batch.transduceSharded, m,
+                                               streams, pool)
+        assert shardedOutputs == outputs
+        print('  sharded over %d processes %.3fs (%.1fx)' %
+              (p, tSharded, t / tSharded))
+
+def benchmarkLTI(lengths = (100000, 1000000)):
+    """
+    Times transduce against transduceLTI on BA2, which declares its
+    difference equation, and on the week 4 accumulator and a cascade of two,
+    whose difference equations are worked out from their parts
+    """
+    def accumulator():
+        return sm.FeedbackAdd(sm.Gain(1), sm.Delay(0))
+    machines = [('BA2', accounts.BA2()),
+                ('accumulator', accumulator()),
+                ('double accumulator', sm.Cascade(accumulator(),
+                                                  accumulator()))]
+    for n in lengths:
+        inputs = deposits(n)
+        for (name, m) in machines:
+            (outputs, t) = timed(m.transduce, inputs)
+            (ltiOutputs, tLTI) = timed(m.transduceLTI, inputs)
+            assert ltiOutputs == outputs
+            print('%s n=%d: transduce %.3fs, transduceLTI %.3fs (%.1fx)' %
+                  (name, n, t, tLTI, t / tLTI))
+
+def benchmarkTracing(n = 200000):
+    """
+    Times switchAccount before, during and after tracing it, and prints the
+    report, which shows where the time goes
+    """
+    inputs = deposits(n)
+    m = accounts.switchAccount
+    (outputs, t) = timed(m.transduce, inputs)
+    tracer = smTracer.Tracer(bufferSize = 10)
+    tracer.attach(m)
+    (tracedOutputs, tTraced) = timed(m.transduce, inputs)
+    tracer.detach()
+    (afterOutputs, tAfter) = timed(m.transduce, inputs)
+    assert tracedOutputs == outputs and afterOutputs == outputs
+    print('switchAccount n=%d: untraced %.3fs, traced %.3fs, after detaching '
+          '%.3fs' % (n, t, tTraced, tAfter))
+    tracer.printReport()
+
+if __name__ == '__main__':
+    benchmarkBlockTransduce()
+    benchmarkStreaming()
+    benchmarkCompiled()
+    benchmarkNestedFeedback()
+    benchmarkCheckpoints()
+    benchmarkBatch()
+    benchmarkLTI()
+    benchmarkTracing()
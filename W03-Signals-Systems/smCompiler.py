@@ -0,0 +1,254 @@
+"""
+Compiles a state machine built out of the combinators in statemachine.py into
+one flat Python function. The state of every primitive machine in the tree
+gets its own local variable, and Delay, Increment and PureFunction machines are
+inlined, so a step doesn't call getNextValues on each machine in the tree or
+build a nested tuple for the new state.
+"""
+import statemachine as sm
+
+class Compiler:
+    """
+    Generates the lines of code for one step of a machine
+
+    Attributes:
+        lines (list): the lines of the step, which read the old states from
+            s0, s1, ... and the input from inp
+        slots (list): the primitive machine whose state is kept in each slot
+        final (list): the variable holding the new state of each slot at the
+            end of the step
+        names (dict): the objects the generated code refers to, by name
+    """
+    def __init__(self):
+        self.lines = []
+        self.slots = []
+        self.final = []
+        self.names = {'safeAdd': sm.safeAdd}
+        self.temps = 0
+        self.next = 0
+
+    def temp(self):
+        self.temps += 1
+        return 't%d' % self.temps
+
+    def name(self, prefix, value):
+        """Returns a name which the generated code can use to refer to value"""
+        name = '%s%d' % (prefix, len(self.names))
+        self.names[name] = value
+        return name
+
+    def emit(self, line):
+        self.lines.append(line)
+
+    def compile(self, m, inp, keep = True):
+        """
+        Generates the code for one step of machine m, given the name of a
+        variable (or the text of an expression) holding its input, and
+        returns the name of the variable holding its output. Feedback
+        machines step their parts twice, once just to find the output; the
+        new states from those steps are thrown away by passing keep as False.
+
+        Returns:
+            the name of the output variable, and the structure of m's state
+            in terms of slots (see nest)
+        """
+        kind = type(m)
+        if kind == sm.Cascade:
+            (o1, layout1) = self.compile(m.m1, inp, keep)
+            (o2, layout2) = self.compile(m.m2, o1, keep)
+            return o2, ('tuple', layout1, layout2)
+        if kind in (sm.Parallel, sm.Parallel2, sm.ParallelAdd):
+            (i1, i2) = (inp, inp)
+            if kind == sm.Parallel2:
+                (i1, i2) = (self.temp(), self.temp())
+                self.emit('(%s, %s) = %s' % (i1, i2, inp))
+            (o1, layout1) = self.compile(m.m1, i1, keep)
+            (o2, layout2) = self.compile(m.m2, i2, keep)
+            out = self.temp()
+            if kind == sm.ParallelAdd:
+                self.emit('%s = %s + %s' % (out, o1, o2))
+            else:
+                self.emit('%s = (%s, %s)' % (out, o1, o2))
+            return out, ('tuple', layout1, layout2)
+        if kind in (sm.Feedback, sm.Feedback2) and hasattr(m.m, 'getOutput'):
+            # The machine is stepped once, with its output, which can be
+            # found from the old states before it is stepped
+            index = len(self.lines)
+            fed = self.temp()
+            if kind == sm.Feedback:
+                (o, layout) = self.compile(m.m, fed, keep)
+            else:
+                (o, layout) = self.compile(m.m, '(%s, %s)' % (inp, fed), keep)
+            self.lines.insert(index, '%s = %s' % (fed,
+                                                  self.output(m.m, layout)))
+            return o, layout
+        if kind in (sm.Feedback, sm.Feedback2):
+            if kind == sm.Feedback:
+                (first, second) = ("'undefined'", '%s')
+            else:
+                (first, second) = ("(%s, 'undefined')" % inp,
+                                   '(' + inp + ', %s)')
+            # The output cannot depend on the input. Both steps use the same
+            # slots, so they start from the same ones.
+            start = self.next
+            (o, layout) = self.compile(m.m, first, False)
+            self.next = start
+            self.compile(m.m, second % o, keep)
+            return o, layout
+        if kind == sm.FeedbackAdd and hasattr(m.m2, 'getOutput'):
+            index = len(self.lines)
+            (o2, error) = (self.temp(), self.temp())
+            (out, layout1) = self.compile(m.m1, error, keep)
+            (ignore, layout2) = self.compile(m.m2, out, keep)
+            self.lines[index:index] = [
+                '%s = %s' % (o2, self.output(m.m2, layout2)),
+                '%s = safeAdd(%s, %s)' % (error, inp, o2)]
+            return out, ('tuple', layout1, layout2)
+        if kind == sm.FeedbackAdd:
+            start = self.next
+            (o1, layout1) = self.compile(m.m1, "'undefined'", False)
+            (o2, layout2) = self.compile(m.m2, o1, False)
+            self.next = start
+            error = self.temp()
+            self.emit('%s = safeAdd(%s, %s)' % (error, inp, o2))
+            (out, layout1) = self.compile(m.m1, error, keep)
+            self.compile(m.m2, out, keep)
+            return out, ('tuple', layout1, layout2)
+        out = self.temp()
+        if kind == sm.Increment:
+            self.emit('%s = %s + %s' % (out, inp, self.name('c', m.incr)))
+            return out, ('constant', m.startState)
+        if kind == sm.PureFunction:
+            self.emit('%s = %s(%s)' % (out, self.name('f', m.f), inp))
+            return out, ('constant', m.startState)
+        # Any other machine keeps its state in a slot
+        slot = self.slotFor(m)
+        new = self.temp()
+        if kind == sm.Delay:
+            self.emit('%s = s%d' % (out, slot))
+            self.emit('%s = %s' % (new, inp))
+        else:
+            self.emit('(%s, %s) = %s.getNextValues(s%d, %s)' %
+                      (new, out, self.name('m', m), slot, inp))
+        if keep:
+            self.final[slot] = new
+        return out, ('slot', slot)
+
+    def state(self, layout):
+        """An expression for the old nested state of a compiled machine"""
+        kind = layout[0]
+        if kind == 'tuple':
+            return '(%s, %s)' % (self.state(layout[1]), self.state(layout[2]))
+        elif kind == 'slot':
+            return 's%d' % layout[1]
+        else:
+            return self.name('c', layout[1])
+
+    def output(self, m, layout):
+        """
+        An expression for the output of a compiled machine with a getOutput
+        method, from its old state
+        """
+        if type(m) == sm.Delay:
+            return self.state(layout)
+        return '%s(%s)' % (self.name('g', m.getOutput), self.state(layout))
+
+    def slotFor(self, m):
+        """
+        Returns the slot for the next primitive machine in the tree, adding
+        one unless this part of the tree has been compiled already (inside a
+        feedback loop, where it is stepped twice)
+        """
+        if self.next < len(self.slots):
+            slot = self.next
+        else:
+            slot = len(self.slots)
+            self.slots.append(m)
+            self.final.append('s%d' % slot)
+        self.next += 1
+        return slot
+
+def nest(layout, flat):
+    """
+    Builds the nested state of the original machine from the flat state of
+    the compiled one
+    """
+    kind = layout[0]
+    if kind == 'tuple':
+        return (nest(layout[1], flat), nest(layout[2], flat))
+    elif kind == 'slot':
+        return flat[layout[1]]
+    else:
+        return layout[1]
+
+def flatten(layout, state, flat):
+    """Fills in the list flat from the nested state of the original machine"""
+    kind = layout[0]
+    if kind == 'tuple':
+        flatten(layout[1], state[0], flat)
+        flatten(layout[2], state[1], flat)
+    elif kind == 'slot':
+        flat[layout[1]] = state
+
+class CompiledSM(sm.SM):
+    """
+    A state machine which computes the same outputs as another machine, with
+    a single generated function for each step. Its state is a flat tuple of
+    the states of the primitive machines in the original one.
+
+    Attributes:
+        machine: the original machine
+        source (str): the generated code
+    """
+    def __init__(self, machine):
+        self.machine = machine
+        compiler = Compiler()
+        (out, self.layout) = compiler.compile(machine, 'inp')
+        self.size = len(compiler.slots)
+        slots = ''.join('s%d, ' % i for i in range(len(compiler.slots)))
+        final = ''.join('%s, ' % v for v in compiler.final)
+        body = ''.join('    ' + line + '\n' for line in compiler.lines)
+        loopBody = ''.join('        ' + line + '\n' for line in compiler.lines)
+        self.source = (
+            'def getNextValues(state, inp):\n'
+            '    (%s) = state\n'
+            '%s'
+            '    return (%s), %s\n'
+            '\n'
+            'def transduce(state, inputs):\n'
+            '    (%s) = state\n'
+            '    outputs = []\n'
+            '    append = outputs.append\n'
+            '    for inp in inputs:\n'
+            '%s'
+            '        (%s) = (%s)\n'
+            '        append(%s)\n'
+            '    return outputs, (%s)\n' %
+            (slots, body, final, out, slots, loopBody, slots, final, out,
+             slots))
+        exec(compile(self.source, '<compiled state machine>', 'exec'),
+             compiler.names)
+        self.getNextValues = compiler.names['getNextValues']
+        self.fusedTransduce = compiler.names['transduce']
+        self.startState = self.flatten(machine.startState)
+        if hasattr(machine, 'done'):
+            self.done = lambda state: machine.done(self.nest(state))
+
+    def nest(self, state):
+        """The state of the original machine for a state of this one"""
+        return nest(self.layout, state)
+
+    def flatten(self, state):
+        """The state of this machine for a state of the original one"""
+        flat = [None] * self.size
+        flatten(self.layout, state, flat)
+        return tuple(flat)
+
+    def transduce(self, inputs):
+        self.start()
+        (outputs, self.state) = self.fusedTransduce(self.state, inputs)
+        return outputs
+
+def compileSM(machine):
+    """Returns a CompiledSM for the machine"""
+    return CompiledSM(machine)
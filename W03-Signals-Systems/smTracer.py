@@ -0,0 +1,179 @@
+"""
+Finds out which parts of a composite state machine take the time. A Tracer
+is attached to a machine, replacing getNextValues on the machines inside it
+with versions that count the calls, time them and remember the last few
+(state, input, output) triples, and detached again afterwards. Machines which
+aren't being traced are left exactly as they were, so tracing costs nothing
+unless it is switched on.
+"""
+import collections
+import json
+import time
+
+class MachineTrace:
+    """
+    What a Tracer has recorded about one named machine
+
+    Attributes:
+        name (str): the machine's name
+        calls (int): the number of calls to getNextValues
+        total (float): seconds spent in those calls, including in the
+            machines inside this one
+        own (float): seconds spent in those calls outside any traced machine
+            inside this one
+        recent: a deque of the last (state, input, output) triples, or None
+    """
+    def __init__(self, name, bufferSize):
+        self.name = name
+        self.calls = 0
+        self.total = 0
+        self.own = 0
+        if bufferSize:
+            self.recent = collections.deque(maxlen = bufferSize)
+        else:
+            self.recent = None
+
+    def toDict(self):
+        result = {'name': self.name,
+                  'calls': self.calls,
+                  'total': self.total,
+                  'own': self.own,
+                  'mean': self.total / self.calls if self.calls else 0}
+        if self.recent != None:
+            # States and inputs can be anything, e.g. io.SensorInput
+            result['recent'] = [[repr(x) for x in step]
+                                for step in self.recent]
+        return result
+
+def isMachine(value):
+    """
+    Whether value is a state machine, from any copy of statemachine.py or
+    lib601.sm: an instance (not a class) with getNextValues and startState
+    """
+    return not isinstance(value, type) and \
+        hasattr(value, 'getNextValues') and hasattr(value, 'startState')
+
+class Tracer:
+    """
+    Records the calls to getNextValues of the machines in a composite
+    machine, by name. A machine is called by its name attribute if it has
+    one (as the sensor machines in the week 6 brains do), and otherwise by
+    the attributes leading to it from the top, e.g. 'Cascade.m1.m2'.
+
+    Only getNextValues is traced, so transduceBlock, getNextValuesBatch and
+    compiled machines skip the tracing on machines which do their own
+    blocks or batches.
+    """
+    def __init__(self, bufferSize = 0, allMachines = True):
+        """
+        Args:
+            bufferSize (int): the number of recent (state, input, output)
+                triples to keep for each machine, or 0 for none
+            allMachines (bool): whether to trace machines without a name
+                attribute too
+        """
+        self.bufferSize = bufferSize
+        self.allMachines = allMachines
+        self.traces = {}
+        self.attached = []
+        # The time spent in traced machines inside each call in progress
+        self.stack = []
+
+    def attach(self, machine, path = None, visited = None):
+        """
+        Starts tracing machine and the machines inside it
+
+        Args:
+            visited (set): the ids of the machines already reached, so that
+                machines which refer back to each other are only attached once
+        """
+        if path == None:
+            path = type(machine).__name__
+        if visited == None:
+            visited = set()
+        if id(machine) in visited or \
+            any(m is machine for (m, f) in self.attached):
+            return
+        visited.add(id(machine))
+        name = getattr(machine, 'name', None)
+        if name == None and self.allMachines:
+            name = path
+        if name != None:
+            self.wrap(machine, name)
+        for (attribute, value) in list(vars(machine).items()):
+            if isMachine(value):
+                self.attach(value, path + '.' + attribute, visited)
+
+    def wrap(self, machine, name):
+        if name not in self.traces:
+            self.traces[name] = MachineTrace(name, self.bufferSize)
+        trace = self.traces[name]
+        stack = self.stack
+        # Compiled machines have their own getNextValues, which has to be put
+        # back when the tracer is detached
+        own = vars(machine).get('getNextValues')
+        self.attached.append((machine, own))
+        getNextValues = machine.getNextValues
+        def traced(state, inp):
+            stack.append(0)
+            start = time.perf_counter()
+            try:
+                result = getNextValues(state, inp)
+            finally:
+                elapsed = time.perf_counter() - start
+                inside = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+            trace.calls += 1
+            trace.total += elapsed
+            trace.own += elapsed - inside
+            if trace.recent != None:
+                trace.recent.append((state, inp, result[1]))
+            return result
+        machine.getNextValues = traced
+
+    def detach(self):
+        """Stops tracing, leaving the machines as they were before attach"""
+        for (machine, own) in self.attached:
+            if own == None:
+                del machine.getNextValues
+            else:
+                machine.getNextValues = own
+        self.attached = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.detach()
+
+    def report(self):
+        """A list of the traces as dicts, the most time of their own first"""
+        return [t.toDict() for t in sorted(self.traces.values(),
+                                           key = lambda t: -t.own)]
+
+    def toJSON(self, indent = None):
+        return json.dumps(self.report(), indent = indent)
+
+    def dump(self, path):
+        """Writes the report to a JSON file"""
+        with open(path, 'w') as f:
+            f.write(self.toJSON(indent = 2))
+
+    def printReport(self):
+        print('%-40s %10s %10s %10s %10s' % ('machine', 'calls', 'total s',
+                                              'own s', 'mean us'))
+        for t in self.report():
+            print('%-40s %10d %10.4f %10.4f %10.2f' %
+                  (t['name'][:40], t['calls'], t['total'], t['own'],
+                   t['mean'] * 1e6))
+
+def trace(machine, inputs, bufferSize = 0, allMachines = True):
+    """
+    Transduces the inputs with machine traced, and returns the outputs and
+    the Tracer
+    """
+    with Tracer(bufferSize, allMachines) as tracer:
+        tracer.attach(machine)
+        outputs = machine.transduce(inputs)
+    return outputs, tracer
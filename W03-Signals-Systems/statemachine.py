@@ -1,8 +1,40 @@
+import itertools
+import pickle
+
+def safeAdd(a, b):
+    """Adds a and b, unless either is 'undefined', in which case so is the sum"""
+    if a == 'undefined' or b == 'undefined':
+        return 'undefined'
+    return a + b
+
+def safeMul(a, b):
+    """Multiplies a by b, unless either is 'undefined', like safeAdd"""
+    if a == 'undefined' or b == 'undefined':
+        return 'undefined'
+    return a * b
+
+def polyAdd(a, b):
+    """Adds two polynomials, given as lists of coefficients from power 0 up"""
+    if len(a) < len(b):
+        a, b = b, a
+    return [x + y for (x, y) in zip(a, b)] + list(a[len(b):])
+
+def polyMul(a, b):
+    """Multiplies two polynomials, given as lists of coefficients"""
+    product = [0] * (len(a) + len(b) - 1)
+    for (i, x) in enumerate(a):
+        for (j, y) in enumerate(b):
+            product[i + j] += x * y
+    return product
+
 class SM:
     """
     A superclass that contains generally useful methods that apply to all state 
     machines. Any subclass of SM needs a startState attribute and the method 
-    getNextValues. 
+    getNextValues. A machine whose output depends only on its state, and not
+    on its input, can also have a getOutput(state) method returning it, which
+    lets the feedback combinators step the machine once per step rather than
+    twice.
     """
     def start(self):
         """
@@ -28,6 +60,112 @@ class SM:
         self.start()
         return [self.step(inp) for inp in inputs]
 
+    def getNextValuesBlock(self, state, inputs):
+        """
+        Takes a list of inputs and returns the state after all of them along
+        with the list of outputs, like calling getNextValues on each input in
+        turn. Machines which can work out a whole block of outputs at once
+        override this; by default it does just call getNextValues.
+        """
+        outputs = []
+        for inp in inputs:
+            state, o = self.getNextValues(state, inp)
+            outputs.append(o)
+        return state, outputs
+
+    def transduceBlock(self, inputs, blockSize = 4096):
+        """
+        Returns the same outputs as transduce, but feeds the inputs to
+        getNextValuesBlock blockSize at a time, which for long input sequences
+        avoids most of the cost of stepping each machine once per input.
+        Composite machines may run their parts over a block one after the
+        other, so getNextValues shouldn't have side effects.
+
+        Args:
+            blockSize (int): the number of inputs in each block, or None to
+                process all of them as one block
+        """
+        self.start()
+        inputs = list(inputs)
+        if blockSize == None:
+            blockSize = max(len(inputs), 1)
+        outputs = []
+        for i in range(0, len(inputs), blockSize):
+            self.state, block = self.getNextValuesBlock(
+                self.state, inputs[i:i + blockSize])
+            outputs.extend(block)
+        return outputs
+
+    def startStateBatch(self, n):
+        """
+        The start states of n copies of the machine, stepped together by
+        getNextValuesBatch. By default this is just a list of n start states,
+        but composite machines keep a batch for each of their parts, so that
+        every part can step all the copies at once.
+        """
+        return [self.startState] * n
+
+    def getNextValuesBatch(self, states, inputs):
+        """
+        Steps n copies of the machine once each: takes their states (from
+        startStateBatch or an earlier call) and a list of n inputs, one for
+        each copy, and returns their new states and the list of n outputs.
+        Machines which can step all the copies at once override this; by
+        default it calls getNextValues for each copy.
+        """
+        newStates = []
+        outputs = []
+        for (state, inp) in zip(states, inputs):
+            state, o = self.getNextValues(state, inp)
+            newStates.append(state)
+            outputs.append(o)
+        return newStates, outputs
+
+    def unbatchStates(self, states):
+        """The state of each copy in a batch, as a list"""
+        return list(states)
+
+    def lti(self):
+        """
+        Returns an LTISM with the same outputs as this machine from its start
+        state, if the machine is known to be linear and time-invariant, or
+        None. Delay, Gain and LTISM are, and so are Cascade, ParallelAdd and
+        FeedbackAdd of them when their parts start at rest (with all their
+        previous inputs and outputs zero). A machine can declare that it is
+        by overriding this.
+        """
+        return None
+
+    def transduceLTI(self, inputs, exact = False):
+        """
+        Returns the same outputs as transduce, by running the difference
+        equation of the machine's LTISM over all the inputs at once if it has
+        one. The machine's own state isn't changed.
+
+        Unless the machine is an LTISM itself, its float outputs only agree
+        with transduce's to within rounding error, since they are worked out
+        in a different order (integer inputs and coefficients give exactly
+        the same outputs). The error stays small for stable machines, but
+        grows with the number of inputs for ones that aren't, e.g. a cascade
+        of two accumulators differs in the sixth significant digit after
+        100000 random inputs. If exact is True, such a machine is transduced
+        step by step instead.
+        """
+        # Both ways of transducing start the machine, so its state is put
+        # back afterwards
+        started = hasattr(self, 'state')
+        state = self.state if started else None
+        try:
+            lti = self.lti()
+            if lti == None or (exact and lti is not self):
+                return self.transduce(inputs)
+            return lti.transduceBlock(inputs, None)
+        finally:
+            if started:
+                self.state = state
+            elif hasattr(self, 'state'):
+                del self.state
+
     def run(self, n = 10):
         """
         For a machine that doesn't consume input 
@@ -41,6 +179,131 @@ class SM:
             return self.transduce([None] * n)
         else: 
             return self.transduce([None] * self.endState)
+
+    def transduceIter(self, inputs, chunkSize = None):
+        """
+        A generator version of transduce, which takes any iterable of inputs
+        (e.g. the lines of a file) and yields the output for each one as it
+        is read, so that it only ever holds one input and one output at a
+        time. If the machine has a done method, it stops as soon as the
+        machine is done.
+
+        Args:
+            chunkSize (int): if given, the inputs are read chunkSize at a time
+                and a list of the outputs for each chunk is yielded instead,
+                with getNextValuesBlock used for machines which can't be done
+        """
+        self.start()
+        inputs = iter(inputs)
+        terminating = hasattr(self, 'done')
+        if chunkSize == None:
+            for inp in inputs:
+                if terminating and self.done(self.state):
+                    return
+                yield self.step(inp)
+            return
+        while not (terminating and self.done(self.state)):
+            chunk = list(itertools.islice(inputs, chunkSize))
+            if len(chunk) == 0:
+                return
+            if terminating:
+                outputs = []
+                for inp in chunk:
+                    if self.done(self.state):
+                        break
+                    outputs.append(self.step(inp))
+            else:
+                self.state, outputs = self.getNextValuesBlock(self.state,
+                                                              chunk)
+            yield outputs
+
+    def runIter(self, n = None, chunkSize = None):
+        """
+        A generator version of run, for a machine that doesn't consume input
+
+        Args:
+            n (int): the most steps to run, or None to run until the machine
+                is done (or forever, if it is never done)
+        """
+        if n == None:
+            inputs = itertools.repeat(None)
+        else:
+            inputs = itertools.repeat(None, n)
+        return self.transduceIter(inputs, chunkSize)
+
+    def structure(self):
+        """
+        The class names of the machine and of the machines inside it, as a
+        tuple of the machine's class name and the structures of the machines
+        in its attributes, in order of attribute name, e.g.
+        ('Cascade', ('Delay',), ('Gain',)) for Cascade(Delay(0), Gain(2))
+        """
+        parts = [value.structure() for (attribute, value)
+                 in sorted(vars(self).items()) if isinstance(value, SM)]
+        return (type(self).__name__,) + tuple(parts)
+
+    def snapshot(self, position = None):
+        """
+        Returns the machine's current state, including the states of all the
+        machines inside a composite machine, as bytes which restore can load,
+        here or in another process with the same machine. The machines
+        themselves aren't saved, since they may contain functions that can't
+        be pickled, so only their states and the machine's structure are.
+
+        Args:
+            position (int): the number of inputs the machine has consumed,
+                which restore returns, or None
+        """
+        return pickle.dumps((self.structure(), position, self.state),
+                            pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, snapshot):
+        """
+        Sets the machine's state to the one saved in a snapshot of a machine
+        with the same structure, i.e. made of the same kinds of machines in
+        the same places, and returns the position saved with it
+        """
+        (structure, position, state) = pickle.loads(snapshot)
+        if structure != self.structure():
+            raise Exception('Snapshot of ' + repr(structure) + ' given to ' +
+                            repr(self.structure()))
+        self.state = state
+        return position
+
+    def transduceCheckpointed(self, inputs, save, every = 10000,
+                              snapshot = None):
+        """
+        Like transduce, but calls save with a snapshot of the machine every
+        `every` inputs, and after the last input, so a long transduction can
+        be picked up again where it left off, after a crash or on another
+        machine, by passing the last snapshot saved back in. A long stream can also be split into shards,
+        each started from a snapshot of the state at the end of the one
+        before.
+
+        Args:
+            inputs: any iterable of inputs, from the beginning of the stream
+            save: a function called with each snapshot (bytes)
+            snapshot: a snapshot from save to resume from, in which case the
+                inputs it has already consumed are skipped
+
+        Returns:
+            the outputs for the inputs after the snapshot
+        """
+        if snapshot == None:
+            self.start()
+            position = 0
+        else:
+            position = self.restore(snapshot)
+        inputs = itertools.islice(inputs, position, None)
+        outputs = []
+        for inp in inputs:
+            outputs.append(self.step(inp))
+            position += 1
+            if position % every == 0:
+                save(self.snapshot(position))
+        if position % every != 0:
+            save(self.snapshot(position))
+        return outputs
             
 class Cascade(SM):
     """
@@ -55,12 +318,45 @@ class Cascade(SM):
         self.m1 = sm1
         self.m2 = sm2
         self.startState = (sm1.startState, sm2.startState)
+        # The output depends only on the state if it does for sm2, or for sm1,
+        # in which case sm2 only ever sees sm1's output
+        if hasattr(sm1, 'getOutput') or hasattr(sm2, 'getOutput'):
+            self.getOutput = self.outputFromState
+    def outputFromState(self, state):
+        s1, s2 = state
+        if hasattr(self.m2, 'getOutput'):
+            return self.m2.getOutput(s2)
+        return self.m2.getNextValues(s2, self.m1.getOutput(s1))[1]
     def getNextValues(self, state, inp):
         s1, s2 = state
         newS1, o1 = self.m1.getNextValues(s1, inp)
         # The output of sm1 gets fed as input to sm2
         newS2, o2 = self.m2.getNextValues(s2, o1)
         return (newS1, newS2), o2 # s, o
+    def getNextValuesBlock(self, state, inputs):
+        s1, s2 = state
+        # sm1's outputs don't depend on sm2, so all of them can be worked out
+        # before sm2 runs
+        newS1, o1 = self.m1.getNextValuesBlock(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBlock(s2, o1)
+        return (newS1, newS2), o2
+    def startStateBatch(self, n):
+        return (self.m1.startStateBatch(n), self.m2.startStateBatch(n))
+    def getNextValuesBatch(self, states, inputs):
+        s1, s2 = states
+        newS1, o1 = self.m1.getNextValuesBatch(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBatch(s2, o1)
+        return (newS1, newS2), o2
+    def lti(self):
+        (l1, l2) = (self.m1.lti(), self.m2.lti())
+        if l1 == None or l2 == None or not (l1.atRest() and l2.atRest()):
+            return None
+        (n1, d1) = l1.systemFunction()
+        (n2, d2) = l2.systemFunction()
+        return LTISM.fromSystemFunction(polyMul(n1, n2), polyMul(d1, d2))
+    def unbatchStates(self, states):
+        s1, s2 = states
+        return list(zip(self.m1.unbatchStates(s1), self.m2.unbatchStates(s2)))
 
 class Delay(SM):
     """Delay state machine, shifts input by one time step"""
@@ -69,6 +365,18 @@ class Delay(SM):
     def getNextValues(self, state, inp):
         # Ouput is the old state
         return inp, state # s, o
+    def getOutput(self, state):
+        return state
+    def getNextValuesBlock(self, state, inputs):
+        if len(inputs) == 0:
+            return state, []
+        # The outputs are the inputs, shifted along by one
+        return inputs[-1], [state] + list(inputs[:-1])
+    def getNextValuesBatch(self, states, inputs):
+        return list(inputs), states
+    def lti(self):
+        # y[n] = x[n - 1], where x[-1] is the start state
+        return LTISM([0, 1], [], previousInputs = [self.startState])
 
 class Increment(SM):
     startState = 0
@@ -76,6 +384,10 @@ class Increment(SM):
         self.incr = incr
     def getNextValues(self, state, inp):
         return state, inp + self.incr # s, o
+    def getNextValuesBlock(self, state, inputs):
+        return state, [inp + self.incr for inp in inputs]
+    def getNextValuesBatch(self, states, inputs):
+        return states, [inp + self.incr for inp in inputs]
 
 class Parallel(SM):
     """
@@ -91,11 +403,31 @@ class Parallel(SM):
         self.m1 = sm1
         self.m2 = sm2
         self.startState = sm1.startState, sm2.startState
+        if hasattr(sm1, 'getOutput') and hasattr(sm2, 'getOutput'):
+            self.getOutput = self.outputFromState
+    def outputFromState(self, state):
+        s1, s2 = state
+        return self.m1.getOutput(s1), self.m2.getOutput(s2)
     def getNextValues(self, state, inp):
         s1, s2 = state 
         newS1, o1 = self.m1.getNextValues(s1, inp)
         newS2, o2 = self.m2.getNextValues(s2, inp)
         return (newS1, newS2), (o1, o2)
+    def getNextValuesBlock(self, state, inputs):
+        s1, s2 = state
+        newS1, o1 = self.m1.getNextValuesBlock(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBlock(s2, inputs)
+        return (newS1, newS2), list(zip(o1, o2))
+    def startStateBatch(self, n):
+        return (self.m1.startStateBatch(n), self.m2.startStateBatch(n))
+    def getNextValuesBatch(self, states, inputs):
+        s1, s2 = states
+        newS1, o1 = self.m1.getNextValuesBatch(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBatch(s2, inputs)
+        return (newS1, newS2), list(zip(o1, o2))
+    def unbatchStates(self, states):
+        s1, s2 = states
+        return list(zip(self.m1.unbatchStates(s1), self.m2.unbatchStates(s2)))
 
 class Parallel2(Parallel):
     def getNextValues(self, state, inp):
@@ -104,13 +436,50 @@ class Parallel2(Parallel):
         newS1, o1 = self.m1.getNextValues(s1, i1)
         newS2, o2 = self.m2.getNextValues(s2, i2)
         return (newS1, newS2), (o1, o2)
+    def getNextValuesBlock(self, state, inputs):
+        s1, s2 = state
+        inputs1 = [i1 for (i1, i2) in inputs]
+        inputs2 = [i2 for (i1, i2) in inputs]
+        newS1, o1 = self.m1.getNextValuesBlock(s1, inputs1)
+        newS2, o2 = self.m2.getNextValuesBlock(s2, inputs2)
+        return (newS1, newS2), list(zip(o1, o2))
+    def getNextValuesBatch(self, states, inputs):
+        s1, s2 = states
+        inputs1 = [i1 for (i1, i2) in inputs]
+        inputs2 = [i2 for (i1, i2) in inputs]
+        newS1, o1 = self.m1.getNextValuesBatch(s1, inputs1)
+        newS2, o2 = self.m2.getNextValuesBatch(s2, inputs2)
+        return (newS1, newS2), list(zip(o1, o2))
 
 class ParallelAdd(Parallel):
+    def outputFromState(self, state):
+        s1, s2 = state
+        return self.m1.getOutput(s1) + self.m2.getOutput(s2)
     def getNextValues(self, state, inp):
         s1, s2 = state
         newS1, o1 = self.m1.getNextValues(s1, inp)
         newS2, o2 = self.m2.getNextValues(s2, inp)
         return (newS1, newS2), o1 + o2
+    def getNextValuesBlock(self, state, inputs):
+        s1, s2 = state
+        newS1, o1 = self.m1.getNextValuesBlock(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBlock(s2, inputs)
+        return (newS1, newS2), [a + b for (a, b) in zip(o1, o2)]
+    def getNextValuesBatch(self, states, inputs):
+        s1, s2 = states
+        newS1, o1 = self.m1.getNextValuesBatch(s1, inputs)
+        newS2, o2 = self.m2.getNextValuesBatch(s2, inputs)
+        return (newS1, newS2), [a + b for (a, b) in zip(o1, o2)]
+    def lti(self):
+        (l1, l2) = (self.m1.lti(), self.m2.lti())
+        if l1 == None or l2 == None or not (l1.atRest() and l2.atRest()):
+            return None
+        (n1, d1) = l1.systemFunction()
+        (n2, d2) = l2.systemFunction()
+        # n1 / d1 + n2 / d2
+        return LTISM.fromSystemFunction(polyAdd(polyMul(n1, d2),
+                                                polyMul(n2, d1)),
+                                        polyMul(d1, d2))
 
 class Feedback(SM):
     """
@@ -120,7 +489,12 @@ class Feedback(SM):
     def __init__(self, sm):
         self.m = sm
         self.startState = self.m.startState
+        if hasattr(sm, 'getOutput'):
+            self.getOutput = sm.getOutput
     def getNextValues(self, state, inp):
+        if hasattr(self.m, 'getOutput'):
+            # The machine is only stepped once, with its output as its input
+            return self.m.getNextValues(state, self.m.getOutput(state))
         # The output cannot depend on the input
         ignore, o = self.m.getNextValues(state, 'undefined')
         newS, ignore = self.m.getNextValues(state, o)
@@ -133,17 +507,188 @@ class Feedback2(Feedback):
     one output
     """
     def getNextValues(self, state, inp):
+        if hasattr(self.m, 'getOutput'):
+            return self.m.getNextValues(state, (inp, self.m.getOutput(state)))
         # The output cannot depend on the input
         ignore, o = self.m.getNextValues(state, (inp, 'undefined'))
         newS, ignore = self.m.getNextValues(state, (inp, o))
         return newS, o
 
+class FeedbackAdd(SM):
+    """
+    Takes two machines, m1 and m2.  Output of the composite machine is
+    the output to m1.  Output of m1 is fed back through m2;  that
+    result is added to the input and used as the 'error'
+    signal, which is the input to m1.  
+    """
+    def __init__(self, m1, m2):
+        self.m1 = m1
+        self.m2 = m2
+        self.startState = self.m1.startState, self.m2.startState
+        if hasattr(m1, 'getOutput'):
+            self.getOutput = self.outputFromState
+
+    def outputFromState(self, state):
+        return self.m1.getOutput(state[0])
+        
+    def getNextValues(self, state, inp):
+        s1, s2 = state
+        if hasattr(self.m2, 'getOutput'):
+            # m2 is stepped once, after m1, so each machine is only stepped
+            # once however deeply feedback loops are nested
+            o2 = self.m2.getOutput(s2)
+        else:
+            # The output of the loop cannot depend on its input, so it is
+            # found first and fed through m2 to work out the input to m1
+            ignore, o1 = self.m1.getNextValues(s1, 'undefined')
+            ignore, o2 = self.m2.getNextValues(s2, o1)
+        (newS1, output) = self.m1.getNextValues(s1, safeAdd(inp,o2))
+        (newS2, o2) = self.m2.getNextValues(s2, output)
+        return ((newS1, newS2), output)
+
+    def lti(self):
+        (l1, l2) = (self.m1.lti(), self.m2.lti())
+        if l1 == None or l2 == None or not (l1.atRest() and l2.atRest()):
+            return None
+        (n1, d1) = l1.systemFunction()
+        (n2, d2) = l2.systemFunction()
+        # Y = H1 (X + H2 Y), so Y / X = H1 / (1 - H1 H2)
+        return LTISM.fromSystemFunction(polyMul(n1, d2),
+                                        polyAdd(polyMul(d1, d2),
+                                                [-c for c in polyMul(n1, n2)]))
+
 class PureFunction(SM):
     startState = None
     def __init__(self, f):
         self.f = f
     def getNextValues(self, state, inp):
         return state, self.f(inp) # s, o
+    def getNextValuesBlock(self, state, inputs):
+        return state, list(map(self.f, inputs))
+    def getNextValuesBatch(self, states, inputs):
+        return states, list(map(self.f, inputs))
+
+class Gain(SM):
+    """Multiplies its input by a constant k"""
+    startState = None
+    def __init__(self, k):
+        self.k = k
+    def getNextValues(self, state, inp):
+        return state, safeMul(self.k, inp)
+    def getNextValuesBlock(self, state, inputs):
+        return state, [self.k * inp for inp in inputs]
+    def getNextValuesBatch(self, states, inputs):
+        return states, [self.k * inp for inp in inputs]
+    def lti(self):
+        return LTISM([self.k], [])
+
+class LTISM(SM):
+    """
+    A linear time-invariant machine, given by the difference equation
+    y[n] = c0 y[n-1] + c1 y[n-2] + ... + d0 x[n] + d1 x[n-1] + ...
+    Its state is the tuple of the previous inputs it still needs, most recent
+    first, and the tuple of previous outputs.
+
+    Attributes:
+        dCoeffs (list): the coefficients d0, d1, ... of the inputs
+        cCoeffs (list): the coefficients c0, c1, ... of the previous outputs
+    """
+    def __init__(self, dCoeffs, cCoeffs, previousInputs = (),
+                 previousOutputs = ()):
+        """
+        Args:
+            previousInputs: x[-1], x[-2], ... which are otherwise 0
+            previousOutputs: y[-1], y[-2], ... which are otherwise 0
+        """
+        self.dCoeffs = list(dCoeffs)
+        self.cCoeffs = list(cCoeffs)
+        (j, k) = (len(self.dCoeffs) - 1, len(self.cCoeffs))
+        xs = tuple(previousInputs)[:j]
+        ys = tuple(previousOutputs)[:k]
+        self.startState = (xs + (0,) * (j - len(xs)),
+                           ys + (0,) * (k - len(ys)))
+
+    @staticmethod
+    def fromSystemFunction(numerator, denominator):
+        """
+        Makes an LTISM at rest from its system function, the ratio of two
+        polynomials in R given as lists of coefficients from R^0 up
+        """
+        while len(numerator) > 1 and numerator[-1] == 0:
+            numerator = numerator[:-1]
+        while len(denominator) > 1 and denominator[-1] == 0:
+            denominator = denominator[:-1]
+        d0 = denominator[0]
+        if d0 == 0:
+            raise Exception('No causal difference equation for system function')
+        if d0 != 1:
+            numerator = [d / d0 for d in numerator]
+            denominator = [c / d0 for c in denominator]
+        return LTISM(numerator, [-c for c in denominator[1:]])
+
+    def systemFunction(self):
+        """The numerator and denominator of the system function, as lists"""
+        return self.dCoeffs, [1] + [-c for c in self.cCoeffs]
+
+    def atRest(self):
+        (xs, ys) = self.startState
+        return all(x == 0 for x in xs) and all(y == 0 for y in ys)
+
+    def getNextValues(self, state, inp):
+        (xs, ys) = state
+        xs = (inp,) + xs
+        # Summed in the same order as the loop from compileBlock
+        (co, do) = (0, 0)
+        for (c, y) in zip(self.cCoeffs, ys):
+            co = co + c * y
+        for (d, x) in zip(self.dCoeffs, xs):
+            do = do + d * x
+        o = co + do
+        return (xs[:len(self.dCoeffs) - 1], ((o,) + ys)[:len(ys)]), o
+
+    def compileBlock(self):
+        """
+        Generates a function which runs the difference equation over a block
+        of inputs, with the previous inputs and outputs in local variables
+        x1, x2, ... and y1, y2, ... and the coefficients written out, so it
+        doesn't build a new state for every input
+        """
+        (j, k) = (len(self.dCoeffs) - 1, len(self.cCoeffs))
+        names = {}
+        for (i, c) in enumerate(self.cCoeffs):
+            names['c%d' % i] = c
+        for (i, d) in enumerate(self.dCoeffs):
+            names['d%d' % i] = d
+        xs = ''.join('x%d, ' % i for i in range(1, j + 1))
+        ys = ''.join('y%d, ' % i for i in range(1, k + 1))
+        co = ''.join(' + c%d * y%d' % (i, i + 1) for i in range(k))
+        do = ''.join(' + d%d * x%d' % (i, i) for i in range(j + 1))
+        source = ('def block(xs, ys, inputs):\n'
+                  '    (%s) = xs\n'
+                  '    (%s) = ys\n'
+                  '    outputs = []\n'
+                  '    append = outputs.append\n'
+                  '    for x0 in inputs:\n'
+                  '        y0 = (0%s) + (0%s)\n'
+                  '        append(y0)\n'
+                  '        (%s) = (%s)\n'
+                  '        (%s) = (%s)\n'
+                  '    return (%s), (%s), outputs\n' %
+                  (xs, ys, co, do,
+                   xs, ''.join('x%d, ' % i for i in range(j)),
+                   ys, ''.join('y%d, ' % i for i in range(k)), xs, ys))
+        exec(source, names)
+        return names['block']
+
+    def getNextValuesBlock(self, state, inputs):
+        (xs, ys) = state
+        if not hasattr(self, 'block'):
+            self.block = self.compileBlock()
+        (xs, ys, outputs) = self.block(xs, ys, inputs)
+        return (xs, ys), outputs
+
+    def lti(self):
+        return self
 
 class Repeat(SM):
     def __init__(self, sm, n = None):
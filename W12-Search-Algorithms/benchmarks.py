@@ -0,0 +1,108 @@
+"""
+Benchmarks for the search code from this week. Running this file prints the
+results of all of them.
+"""
+import time
+import search
+import searchAlgorithms
+import farmer
+
+def timed(f, *args, **kwargs):
+    """Returns the result of calling f and the number of seconds it took"""
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def benchmarkThroughput(maxNodesList = (1000, 10000, 100000, 1000000)):
+    """
+    Times breadth first search with dynamic programming on NumberTestSM with
+    a goal that can't be reached, so each search runs until it has visited
+    maxNodes states
+    """
+    for maxNodes in maxNodesList:
+        # Only integers are reachable from 1, so the goal is never found
+        (path, t) = timed(search.smSearch, searchAlgorithms.NumberTestSM(0.5),
+                          initialState = 1, maxNodes = maxNodes)
+        print('smSearch maxNodes=%d: %.3fs (%.0f nodes/s)' %
+              (maxNodes, t, maxNodes / t))
+
+def benchmarkFiniteSpace(maxVals = (1000, 10000, 100000)):
+    """
+    Times breadthFirstSearchDP exhausting the whole state space of
+    NumberTestFiniteSM, which has 2 * maxVal - 1 states
+    """
+    for maxVal in maxVals:
+        m = searchAlgorithms.NumberTestFiniteSM(0.5, maxVal)
+        (path, t) = timed(searchAlgorithms.breadthFirstSearchDP, 1, m.done,
+                          lambda s: m.legalInputs,
+                          lambda s, a: m.getNextValues(s, a)[0])
+        nodes = 2 * maxVal - 1
+        print('breadthFirstSearchDP maxVal=%d: %.3fs (%.0f nodes/s)' %
+              (maxVal, t, nodes / t))
+
+class FarmerProblem(farmer.FarmerGoatWolfCabbage):
+    """
+    FarmerGoatWolfCabbage as a search problem. Taking an item from the other
+    bank leaves the state as it is instead of raising an exception, and the
+    goal test compares the contents of the states, which are lists after the
+    first move.
+    """
+    def getNextValues(self, state, action):
+        try:
+            return farmer.FarmerGoatWolfCabbage.getNextValues(self, state,
+                                                              action)
+        except Exception:
+            return list(state), list(state)
+    def done(self, state):
+        return list(state) == list(self.goal)
+
+def benchmarkTranspositionTable(maxNodesList = (10000, 100000)):
+    """
+    Compares the speed of dynamic programming with a set of states and with a
+    TranspositionTable on NumberTestSM, and solves FarmerGoatWolfCabbage,
+    whose states are lists, with and without a table that turns them into
+    tuples
+    """
+    for maxNodes in maxNodesList:
+        m = searchAlgorithms.NumberTestSM(0.5)
+        (path, t) = timed(search.smSearch, m, initialState = 1,
+                          maxNodes = maxNodes)
+        print('smSearch maxNodes=%d with a set: %.3fs' % (maxNodes, t))
+        table = search.TranspositionTable()
+        (path, t) = timed(search.smSearch, m, initialState = 1,
+                          maxNodes = maxNodes, table = table)
+        print('smSearch maxNodes=%d with a table: %.3fs (%d states)' %
+              (maxNodes, t, len(table)))
+    table = search.TranspositionTable(tuple)
+    (path, t) = timed(search.smSearch, FarmerProblem(), table = table)
+    print('FarmerGoatWolfCabbage with a table: %d steps, %d states, %.4fs' %
+          (len(path) - 1, len(table), t))
+    for DP in (True, False):
+        (path, t) = timed(search.smSearch, FarmerProblem(), DP = DP)
+        print('FarmerGoatWolfCabbage with DP=%s: %d steps, %.4fs' %
+              (DP, len(path) - 1, t))
+
+def benchmarkPathLookups(depths = (10, 100, 1000, 10000), lookups = 20000):
+    """
+    Times SearchNode.inPath at the end of a path of each depth, for states
+    which aren't on it, to check that the time per lookup stays about the
+    same however long the path is
+    """
+    for depth in depths:
+        node = search.SearchNode(None, 0, None)
+        for s in range(1, depth):
+            node = search.SearchNode(None, s, node)
+        # The first lookup builds the node's trie
+        node.inPath(-1)
+        start = time.perf_counter()
+        for s in range(depth, depth + lookups):
+            node.inPath(s)
+        t = time.perf_counter() - start
+        print('inPath at depth %d: %.0f ns per lookup' %
+              (depth, t / lookups * 1e9))
+
+if __name__ == '__main__':
+    benchmarkThroughput()
+    benchmarkFiniteSpace()
+    benchmarkTranspositionTable()
+    benchmarkPathLookups()
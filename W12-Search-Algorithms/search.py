@@ -1,13 +1,74 @@
+from array import array
+from collections import deque
 import statemachine as sm
 
+# The states on the path to each SearchNode are kept in a persistent hash
+# trie, which it shares with its parent's. A trie is a tuple of trieWidth
+# slots, indexed by trieBits bits of the hash at a time, each of which is
+# None, a TrieLeaf or another trie; adding a state only copies the tuples on
+# the way down to its slot.
+trieBits = 4
+trieWidth = 1 << trieBits
+hashMask = (1 << 64) - 1
+emptyTrie = (None,) * trieWidth
+
+class TrieLeaf:
+    """The states in a trie whose hashes are key"""
+    __slots__ = ('key', 'states')
+    def __init__(self, key, states):
+        self.key = key
+        self.states = states
+
+def trieAdd(trie, key, state, shift = 0):
+    """Returns a trie with the states in trie and state, whose hash is key"""
+    i = (key >> shift) & (trieWidth - 1)
+    slot = trie[i]
+    if slot == None:
+        slot = TrieLeaf(key, (state,))
+    elif type(slot) == TrieLeaf:
+        if slot.key == key:
+            if state in slot.states:
+                return trie
+            slot = TrieLeaf(key, slot.states + (state,))
+        else:
+            # The keys are told apart further down
+            below = list(emptyTrie)
+            below[(slot.key >> (shift + trieBits)) & (trieWidth - 1)] = slot
+            slot = trieAdd(tuple(below), key, state, shift + trieBits)
+    else:
+        slot = trieAdd(slot, key, state, shift + trieBits)
+    return trie[:i] + (slot,) + trie[i + 1:]
+
+def trieContains(trie, key, state):
+    """Whether state, whose hash is key, is in the trie"""
+    shift = 0
+    while True:
+        slot = trie[(key >> shift) & (trieWidth - 1)]
+        if slot == None:
+            return False
+        if type(slot) == TrieLeaf:
+            return slot.key == key and state in slot.states
+        trie = slot
+        shift += trieBits
+
 class SearchNode:
     """
-    A class representing a search node
+    A class representing a search node.
+
+    Besides its parent, each node keeps its depth in the tree and, once inPath
+    has been called on it, a trie of the states on the path from the root to
+    it, so that inPath doesn't have to walk up the tree.
     """
+    __slots__ = ('state', 'action', 'parent', 'depth', 'trie')
     def __init__(self, action, state, parent):
         self.state = state
         self.action = action
         self.parent = parent
+        if self.parent:
+            self.depth = self.parent.depth + 1
+        else:
+            self.depth = 0
+        self.trie = None
     
     def path(self):
         """
@@ -16,22 +77,53 @@ class SearchNode:
         tree, until it reaches a node whose parent is None.
         e.g. for D: ((None, 'S'), (1, 'B'), (1, 'D'))
         """
-        if self.parent == None:
-            return [(self.action, self.state)]
-        else:
-            return self.parent.path() + [(self.action, self.state)]
+        path = []
+        node = self
+        while node != None:
+            path.append((node.action, node.state))
+            node = node.parent
+        path.reverse()
+        return path
     
+    def pathTrie(self):
+        """
+        Returns the trie of the states on the path from the root to this
+        node, or False if one of them can't be hashed. It is built from the
+        nearest ancestor's the first time it is needed.
+        """
+        node = self
+        missing = []
+        while node != None and node.trie == None:
+            missing.append(node)
+            node = node.parent
+        trie = emptyTrie if node == None else node.trie
+        for node in reversed(missing):
+            if trie != False:
+                try:
+                    trie = trieAdd(trie, hash(node.state) & hashMask, node.state)
+                except TypeError:
+                    trie = False
+            node.trie = trie
+        return trie
+
     def inPath(self, s):
         """
         Takes a state, and returns True if the state occurs anywhere in the path
         from the root to the node.
         """
-        if s == self.state:
-            return True
-        elif self.parent == None:
-            return False
-        else:
-            return self.parent.inPath(s)
+        trie = self.pathTrie()
+        if trie != False:
+            try:
+                return trieContains(trie, hash(s) & hashMask, s)
+            except TypeError:
+                pass
+        # Paths with states that can't be hashed are searched one by one
+        node = self
+        while node != None:
+            if s == node.state:
+                return True
+            node = node.parent
+        return False
 
 map1 = {'S' : ['A', 'B'],
         'A' : ['S', 'C', 'D'],
@@ -69,28 +161,116 @@ class Stack:
         """
         return self.data.pop()
     def isEmpty(self):
-        return self.data is []
+        return len(self.data) == 0
 
 class Queue:
-    """A class representing queues as lists"""
+    """
+    A class representing queues as double-ended queues, so that items can be
+    popped off the front in constant time
+    """
     def __init__(self):
-        self.data = []
+        self.data = deque()
     def push(self, item):
         self.data.append(item)
     def pop(self):
         """
-        Pops items off of the front of the list, ensuring that the oldest items
+        Pops items off of the front of the queue, ensuring that the oldest items
         get popped off first.
         """
-        return self.data.pop(0)
+        return self.data.popleft()
     def isEmpty(self):
-        return self.data is []
+        return len(self.data) == 0
+
+class StateSet:
+    """
+    A set of states which can also hold states that can't be hashed, such as
+    lists, by keeping those in a list and checking them one by one. Searches
+    use plain sets until they find such a state, and StateSets after that.
+    """
+    def __init__(self, states = ()):
+        self.hashed = set()
+        self.unhashed = []
+        for s in states:
+            self.add(s)
+    def add(self, s):
+        try:
+            self.hashed.add(s)
+        except TypeError:
+            if s not in self.unhashed:
+                self.unhashed.append(s)
+    def __contains__(self, s):
+        try:
+            return s in self.hashed
+        except TypeError:
+            return s in self.unhashed
+    def __iter__(self):
+        yield from self.hashed
+        yield from self.unhashed
+    def __len__(self):
+        return len(self.hashed) + len(self.unhashed)
+
+def stateSet(states = ()):
+    """A set of the states, or a StateSet if some of them can't be hashed"""
+    try:
+        return set(states)
+    except TypeError:
+        return StateSet(states)
+
+class TranspositionTable:
+    """
+    A table of the states reached by a search, for dynamic programming on
+    states which can't be hashed (such as lists) or which have several
+    equivalent forms. Each state is passed through a canonicalization
+    function, and the result is interned as a small integer id, under which
+    the table keeps the smallest depth the state has been reached at.
+
+    Attributes:
+        ids (dict): the id of each canonical state, numbered from 0
+        costs (array): the smallest depth known for the state with each id
+    """
+    def __init__(self, canonical = None):
+        """
+        Args:
+            canonical: a function which takes a state and returns a hashable
+                state that stands for every state equivalent to it (e.g. tuple
+                for states that are lists), or None to use states as they are
+        """
+        self.canonical = canonical
+        self.ids = {}
+        self.costs = array('d')
+    def intern(self, state):
+        """Returns the id of the state, giving it a new one if it is new"""
+        if self.canonical != None:
+            state = self.canonical(state)
+        i = self.ids.get(state)
+        if i == None:
+            i = len(self.costs)
+            self.ids[state] = i
+            self.costs.append(float('inf'))
+        return i
+    def improve(self, i, cost):
+        """
+        Records cost (a depth) for the state with id i, and returns True, if
+        it is lower than the lowest cost known for that state
+        """
+        if cost < self.costs[i]:
+            self.costs[i] = cost
+            return True
+        return False
+    def __len__(self):
+        return len(self.costs)
 
 def search(initialState, goalTest, actions, successor,
-            depthFirst = False, DP = True, maxNodes = 10000):
+            depthFirst = False, DP = True, maxNodes = 10000, table = None):
     """
     Models either a Depth First Search or Breadth First Search algorithm with
     the option to use dynamic programming
+
+    Args:
+        table: a TranspositionTable to keep track of the states that have been
+            reached, by their canonical forms, instead of a set of the states
+            themselves; with dynamic programming, a state is then searched
+            again if it is reached by a shorter path
     """
     if depthFirst:
         agenda = Stack()
@@ -100,32 +280,51 @@ def search(initialState, goalTest, actions, successor,
     if goalTest(initialState):
         return startNode.path()
     agenda.push(startNode)
-    if DP: visited = {initialState: True}
+    # Sets of states, so that checking for a state takes constant time
+    if DP and table == None: visited = stateSet([initialState])
+    newSet = set
+    if table != None: table.improve(table.intern(initialState), 0)
     count = 1
     while not agenda.isEmpty() and maxNodes > count:
         n = agenda.pop()
-        newStates = []
+        if DP and table != None and \
+            n.depth > table.costs[table.intern(n.state)]:
+            # A shorter path to this state was found after n was added
+            continue
+        newStates = newSet()
         for a in actions:
             newS = successor(n.state, a)
             newN = SearchNode(a, newS, n)
+            # States are identified by their ids in the table, if there is one
+            key = newS if table == None else table.intern(newS)
             if goalTest(newS):
                 return newN.path()
-            elif newS in newStates:
-                pass
-            elif ((not DP) and n.inPath(newS)) or \
-                (DP and (newS in visited.keys())):
+            try:
+                seen = key in newStates or \
+                    (DP and table == None and newS in visited)
+            except TypeError:
+                # newS can't be hashed, so the sets can't hold it
+                newSet = StateSet
+                newStates = StateSet(newStates)
+                if DP and table == None: visited = StateSet(visited)
+                seen = key in newStates or \
+                    (DP and table == None and newS in visited)
+            if seen or ((not DP) and n.inPath(newS)) or \
+                (DP and table != None and not table.improve(key, newN.depth)):
                 pass
             else:
                 count += 1
-            if DP: visited[newS] = True
-            newStates.append(newS)
-            agenda.push(newN)
+                if DP and table == None: visited.add(newS)
+                newStates.add(key)
+                agenda.push(newN)
     return None
 
 def smSearch(smToSearch, initialState = None, goalTest = None, maxNodes = 10000,
-            depthFirst = False, DP = True):
+            depthFirst = False, DP = True, table = None):
     """
-    Uses state machines as a representation of state-space search problems
+    Uses state machines as a representation of state-space search problems.
+    Machines whose states are lists can be searched as they are, but passing
+    a TranspositionTable(tuple) as the table lets the states be hashed.
     """
     if initialState == None:
         initialState = smToSearch.startState
@@ -135,4 +334,4 @@ def smSearch(smToSearch, initialState = None, goalTest = None, maxNodes = 10000,
                     # Just returns the next state instead of tuple
                     lambda s, a: smToSearch.getNextValues(s, a)[0],
                     maxNodes = maxNodes,
-                    depthFirst=depthFirst, DP=DP)
\ No newline at end of file
+                    depthFirst=depthFirst, DP=DP, table=table)
\ No newline at end of file
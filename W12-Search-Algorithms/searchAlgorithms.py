@@ -15,7 +15,7 @@ def depthFirstSearch(initialState, goalTest, actions, successor):
         # Pop the node to be expanded off of the agenda
         parent = agenda.pop()
         # Keep track of all of the new states we have reached from this node
-        newChildStates = []
+        newChildStates = set()
         for a in actions(parent.state):
             # Visit the successor states that can be reached via the actions
             newS = successor(parent.state, a)
@@ -38,7 +38,7 @@ def depthFirstSearch(initialState, goalTest, actions, successor):
                 """
                 pass
             else:
-                newChildStates.append(newS)
+                newChildStates.add(newS)
                 # Push newly visited nodes onto the agenda
                 agenda.push(newN)
     return None
@@ -60,7 +60,7 @@ def breadthFirstSearch(initialState, goalTest, actions, successor):
         # Pop the node to be expanded off of the agenda
         parent = agenda.pop()
         # Keep track of all of the new states we have reached from this node
-        newChildStates = []
+        newChildStates = set()
         for a in actions(parent.state):
             # Visit the successor states that can be reached via the actions
             newS = successor(parent.state, a)
@@ -83,7 +83,7 @@ def breadthFirstSearch(initialState, goalTest, actions, successor):
                 """
                 pass
             else:
-                newChildStates.append(newS)
+                newChildStates.add(newS)
                 # Push newly visited nodes onto the agenda
                 agenda.push(newN)
     return None
@@ -97,7 +97,7 @@ def breadthFirstSearchDP(initialState, goalTest, actions, successor):
     rootNode = search.SearchNode(None, initialState, None)
     # Push the initial node onto the agenda
     agenda.push(rootNode)
-    visited = {initialState: True}
+    visited = {initialState}
     # Run until we find a goal state or the agenda is empty
     while not agenda.isEmpty():
         # Pop the node to be expanded off of the agenda
@@ -108,12 +108,12 @@ def breadthFirstSearchDP(initialState, goalTest, actions, successor):
             newN = search.SearchNode(a, newS, parent) # action, state, parent
             if goalTest(newS):
                 return newN.path()
-            elif newS in visited.keys():
+            elif newS in visited:
                 # Don't add it to the queue because we already have a shortest 
                 # path to that node
                 pass 
             else:
-                visited[newS] = True
+                visited.add(newS)
                 # Push newly visited nodes onto the agenda
                 agenda.push(newN)
     return None
@@ -0,0 +1,106 @@
+import multiprocessing
+import time
+import lib601.util as util
+import lib601.basicGridMap as basicGridMap
+import occupancyGrid
+import heuristics
+import search
+
+# The occupancy grid used by a worker process, set once when it starts
+workerGrid = None
+
+def pathFromField(grid, field, start, goal):
+    """
+    Finds the path from the start to the goal with the planner's A* search,
+    using the distance field from heuristics.distanceField as the heuristic.
+    The field is exact, so the search goes straight down it, and it finds
+    the same path as planner.planner with heuristics.exact.
+
+    Returns:
+        a list of (action, state) pairs like the one from ucSearch, or None if
+        the goal can't be reached from the start
+    """
+    if start not in field:
+        return None
+    infinity = float('inf')
+    return search.ucSearch(start, lambda s: s == goal, None, None,
+                           lambda s: field.get(s, infinity),
+                           successors = grid.successors)
+
+def planGroup(grid, goal, starts):
+    """
+    Plans from each of the starts to one goal, with a single reverse Dijkstra
+    search from the goal shared by all of them
+
+    Returns:
+        a list with a (path, latency) pair for each start, where latency
+        includes the time taken to build the shared search tree
+    """
+    begin = time.perf_counter()
+    field = heuristics.distanceField(grid, goal)
+    treeTime = time.perf_counter() - begin
+    results = []
+    for start in starts:
+        begin = time.perf_counter()
+        path = pathFromField(grid, field, start, goal)
+        results.append((path, treeTime + time.perf_counter() - begin))
+    return results
+
+def initWorker(grid):
+    global workerGrid
+    workerGrid = grid
+
+def planGroupInWorker(args):
+    (goal, starts) = args
+    return planGroup(workerGrid, goal, starts)
+
+def batchPlanner(queries, worldPath, gridSquareSize, processes = None):
+    """
+    Plans paths for many (initialPose, goalPoint) queries in the same world.
+    The map is only built once, as a BasicGridMap like the planner's, the
+    queries are grouped by goal cell so that one search tree serves every
+    query to that goal, and the groups are planned in parallel over a pool of
+    processes. Each path is the one planner.planner finds with
+    heuristics.exact.
+
+    Args:
+        processes (int): the number of processes to use; by default, one per
+            CPU, and if it is 1 everything is planned in this process
+
+    Returns:
+        a list with a (path, latency) pair for each query, in order, where
+        latency is the time in seconds spent planning that query
+    """
+    gm = basicGridMap.BasicGridMap(worldPath, gridSquareSize)
+    grid = occupancyGrid.fromMap(gm)
+    # Goal indices -> list of (query number, start indices)
+    groups = {}
+    for (q, (initialPose, goalPoint)) in enumerate(queries):
+        (initialX, initialY) = initialPose.xytTuple()[:2]
+        start = gm.pointToIndices(util.Point(initialX, initialY))
+        goal = gm.pointToIndices(goalPoint)
+        groups.setdefault(goal, []).append((q, start))
+    work = [(goal, [start for (q, start) in group])
+            for (goal, group) in groups.items()]
+    if processes == 1:
+        answers = [planGroup(grid, goal, starts) for (goal, starts) in work]
+    else:
+        with multiprocessing.Pool(processes, initWorker, (grid,)) as pool:
+            answers = pool.map(planGroupInWorker, work)
+    results = [None] * len(queries)
+    for (group, answer) in zip(groups.values(), answers):
+        for ((q, start), result) in zip(group, answer):
+            results[q] = result
+    return results
+
+def testBatchPlanner(queries, worldPath, gridSquareSize, processes = None):
+    """Plans a batch of queries and prints the latency and throughput"""
+    begin = time.perf_counter()
+    results = batchPlanner(queries, worldPath, gridSquareSize, processes)
+    total = time.perf_counter() - begin
+    latencies = [latency for (path, latency) in results]
+    print('%d queries in %.3fs (%.1f queries/s)' %
+          (len(queries), total, len(queries) / total))
+    print('latency: mean %.4fs, max %.4fs' %
+          (sum(latencies) / len(latencies), max(latencies)))
+    return results
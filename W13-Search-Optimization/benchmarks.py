@@ -0,0 +1,622 @@
+"""
+Benchmarks for the search and planning code from this week. Running this file
+prints the results of all of them.
+"""
+import random
+import json
+import math
+import multiprocessing
+import shutil
+import tempfile
+import time
+import search
+import planner
+import heuristics
+import searchStats
+import jps
+import smoothing
+import dStarLite
+import batchPlanner
+import worldLoader
+import statemachine as sm
+import lib601.util as util
+import lib601.basicGridMap as basicGridMap
+
+def timed(f, *args, **kwargs):
+    """Returns the result of calling f and the number of seconds it took"""
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def gridProblem(world, gridSquareSize = None):
+    """
+    Builds the map for one of the worlds in planner.py
+
+    Returns:
+        the grid map, the start indices and the goal indices
+    """
+    (worldPath, size, goalPoint, initialPose) = world
+    if gridSquareSize == None:
+        gridSquareSize = size
+    gm = basicGridMap.BasicGridMap(worldPath, gridSquareSize)
+    (initialX, initialY) = initialPose.xytTuple()[:2]
+    start = gm.pointToIndices(util.Point(initialX, initialY))
+    goal = gm.pointToIndices(goalPoint)
+    return gm, start, goal
+
+def benchmarkAgenda(world = planner.bigPlanWorld, sizes = (0.25, 0.1, 0.05)):
+    """
+    Compares node expansions per second of A* on a grid world when the agenda
+    is the list based ListPQ and when it is the heap based PQ
+    """
+    for size in sizes:
+        (gm, start, goal) = gridProblem(world, size)
+        def heuristic(s):
+            return ((goal[0] - s[0])**2 + (goal[1] - s[1])**2)**0.5
+        for agendaClass in (search.ListPQ, search.PQ):
+            expansions = [0]
+            def goalTest(s):
+                # The goal test is called once for every expanded node
+                expansions[0] += 1
+                return s == goal
+            (path, t) = timed(search.ucSmSearch, planner.GridDynamics(gm),
+                              initialState = start, goalTest = goalTest,
+                              heuristic = heuristic, agendaClass = agendaClass)
+            print('%s size=%.2f: %d expansions in %.3fs (%.0f/s)' %
+                  (agendaClass.__name__, size, expansions[0], t,
+                   expansions[0] / t))
+
+def benchmarkGridBackend(world = planner.bigPlanWorld,
+                         sizes = (0.25, 0.1, 0.05)):
+    """
+    Compares A* on a grid world when the successors of a state come from
+    calling GridDynamics.getNextValues for each action and when they come from
+    the occupancy grid's successor table in one call
+    """
+    for size in sizes:
+        (gm, start, goal) = gridProblem(world, size)
+        dynamics = planner.GridDynamics(gm)
+        def heuristic(s):
+            return ((goal[0] - s[0])**2 + (goal[1] - s[1])**2)**0.5
+        for (name, successors) in (('per action', None),
+                                   ('batched', dynamics.successors)):
+            (path, t) = timed(search.ucSearch, start, lambda s: s == goal,
+                              dynamics.legalInputs, dynamics.getNextValues,
+                              heuristic, successors = successors)
+            print('%s size=%.2f: %.3fs' % (name, size, t))
+
+def benchmarkHeuristics(world = planner.bigPlanWorld, sizes = (0.25, 0.1, 0.05),
+                        queries = 5):
+    """
+    Compares A* on a grid world with the straight line distance, the octile
+    distance and the exact distance field as heuristics, planning to the same
+    goal several times so the distance field is only computed on the first
+    """
+    for size in sizes:
+        (gm, start, goal) = gridProblem(world, size)
+        dynamics = planner.GridDynamics(gm)
+        def euclidean(worldPath, gridSquareSize, grid, goal):
+            step = grid.stepSize
+            return lambda s: step * ((goal[0] - s[0])**2 +
+                                     (goal[1] - s[1])**2)**0.5
+        for provider in (euclidean, heuristics.octile, heuristics.exact):
+            expansions = [0]
+            def goalTest(s):
+                expansions[0] += 1
+                return s == goal
+            def query():
+                heuristic = provider(world[0], size, dynamics.grid, goal)
+                return search.ucSmSearch(dynamics, initialState = start,
+                                         goalTest = goalTest,
+                                         heuristic = heuristic)
+            times = [timed(query)[1] for i in range(queries)]
+            print('%s size=%.2f: %d expansions per query, first %.3fs, '
+                  'then %.3fs' % (provider.__name__, size,
+                                  expansions[0] / queries, times[0],
+                                  min(times[1:])))
+
+def benchmarkReplanning(worlds = (planner.bigPlanWorld, planner.mapTestWorld),
+                        sizes = (0.25, 0.1), steps = 20, seed = 0):
+    """
+    Simulates a robot which moves one cell along its plan and then observes a
+    new obstacle on the path ahead of it, and compares the time it takes D*
+    Lite to replan against planning from scratch with A*
+    """
+    for world in worlds:
+        for size in sizes:
+            random.seed(seed)
+            (gm, start, goal) = gridProblem(world, size)
+            dynamics = planner.GridDynamics(gm)
+            incremental = dStarLite.DStarLite(dynamics, start, goal)
+            (path, first) = timed(incremental.plan)
+            replans = []
+            fromScratch = []
+            for i in range(steps):
+                if path == None or len(path) < 4:
+                    break
+                start = path[1][1]
+                blocked = path[random.randrange(2, len(path) - 1)][1]
+                incremental.updateCells([(blocked, False)])
+                (path, t) = timed(incremental.plan, start)
+                replans.append(t)
+                # The occupancy grid is shared, so A* sees the same obstacles
+                heuristic = heuristics.octile(world[0], size, dynamics.grid,
+                                              goal)
+                (aStarPath, t) = timed(search.ucSmSearch, dynamics,
+                                       initialState = start,
+                                       goalTest = lambda s: s == goal,
+                                       heuristic = heuristic)
+                fromScratch.append(t)
+            print('%s size=%.2f: first plan %.4fs, %d replans, D* Lite '
+                  '%.4fs, A* %.4fs on average' %
+                  (world[0], size, first, len(replans),
+                   sum(replans) / len(replans),
+                   sum(fromScratch) / len(fromScratch)))
+
+def benchmarkBatch(world = planner.bigPlanWorld, size = 0.1, queries = 200,
+                   goals = 4, processes = (1, 4), seed = 0):
+    """
+    Compares planning many queries one at a time with A* against the batch
+    planner, for queries with random starts and a few shared goals
+    """
+    random.seed(seed)
+    (gm, start, goal) = gridProblem(world, size)
+    dynamics = planner.GridDynamics(gm)
+    free = [(i, j) for i in range(gm.xN) for j in range(gm.yN)
+            if dynamics.grid.canOccupy((i, j))]
+    goalCells = random.sample(free, goals)
+    cells = [(random.choice(free), random.choice(goalCells))
+             for q in range(queries)]
+    def oneAtATime():
+        for (start, goal) in cells:
+            heuristic = heuristics.octile(world[0], size, dynamics.grid, goal)
+            search.ucSmSearch(dynamics, initialState = start,
+                              goalTest = lambda s: s == goal,
+                              heuristic = heuristic)
+    (paths, t) = timed(oneAtATime)
+    print('A* one at a time: %d queries in %.3fs (%.1f queries/s)' %
+          (queries, t, queries / t))
+    def pose(cell):
+        (x, y) = gm.indicesToPoint(cell).xyTuple()
+        return util.Pose(x, y, 0.0)
+    batch = [(pose(start), gm.indicesToPoint(goal))
+             for (start, goal) in cells]
+    for n in processes:
+        print('batch planner with %d processes:' % n)
+        batchPlanner.testBatchPlanner(batch, world[0], size, n)
+
+def checkBatchPlanner(worlds = (planner.bigPlanWorld, planner.mapTestWorld),
+                      size = 0.25, queries = 40, goals = 3, seed = 0):
+    """
+    Checks that the batch planner returns the same path for every query as
+    planner.planner does on its own, with heuristics.exact
+    """
+    random.seed(seed)
+    for world in worlds:
+        (gm, start, goal) = gridProblem(world, size)
+        grid = planner.GridDynamics(gm).grid
+        free = [(i, j) for i in range(gm.xN) for j in range(gm.yN)
+                if grid.canOccupy((i, j))]
+        goalCells = random.sample(free, goals)
+        def pose(cell):
+            (x, y) = gm.indicesToPoint(cell).xyTuple()
+            return util.Pose(x, y, 0.0)
+        batch = [(pose(random.choice(free)),
+                  gm.indicesToPoint(random.choice(goalCells)))
+                 for q in range(queries)]
+        results = batchPlanner.batchPlanner(batch, world[0], size, 1)
+        for ((initialPose, goalPoint), (path, latency)) in zip(batch, results):
+            single = planner.planner(initialPose, goalPoint, world[0], size,
+                                     heuristicProvider = heuristics.exact,
+                                     headless = True)
+            assert path == single, (path, single)
+        print('%s size=%.2f: batch planner matched planner on %d queries' %
+              (world[0], size, queries))
+
+def benchmarkWorldLoading(worlds = (planner.bigPlanWorld, planner.mapTestWorld),
+                          sizes = (0.25, 0.1, 0.05)):
+    """
+    Compares the time to build a BasicGridMap of a world with the time
+    worldLoader takes to load its grid with an empty disk cache, with a warm
+    disk cache, and when it has already been loaded in this process
+    """
+    cacheDir = tempfile.mkdtemp()
+    try:
+        for world in worlds:
+            for size in sizes:
+                (gm, t) = timed(basicGridMap.BasicGridMap, world[0], size)
+                print('%s size=%.2f: BasicGridMap %.4fs' % (world[0], size, t))
+                worldLoader.loaded.clear()
+                (grid, cold) = timed(worldLoader.load, world[0], size,
+                                     cacheDir = cacheDir)
+                worldLoader.loaded.clear()
+                (grid, warm) = timed(worldLoader.load, world[0], size,
+                                     cacheDir = cacheDir)
+                (grid, memory) = timed(worldLoader.load, world[0], size,
+                                       cacheDir = cacheDir)
+                print('%s size=%.2f: worldLoader cold %.4fs, disk cache '
+                      '%.4fs, in memory %.6fs' %
+                      (world[0], size, cold, warm, memory))
+    finally:
+        shutil.rmtree(cacheDir)
+
+def checkWorldLoading(worlds = (planner.bigPlanWorld, planner.mapTestWorld),
+                      sizes = (0.25, 0.1, 0.05)):
+    """
+    Checks that worldLoader's grid of each world, both when it is built and
+    when it is read back from the disk cache, has exactly the same cells as a
+    BasicGridMap of it
+    """
+    cacheDir = tempfile.mkdtemp()
+    try:
+        for world in worlds:
+            for size in sizes:
+                gm = basicGridMap.BasicGridMap(world[0], size)
+                for source in ('built', 'cached'):
+                    worldLoader.loaded.clear()
+                    grid = worldLoader.load(world[0], size, cacheDir = cacheDir)
+                    cells = worldLoader.differences(grid, gm)
+                    assert cells == [], \
+                        '%s size=%.2f: %s grid differs from BasicGridMap at %s' \
+                        % (world[0], size, source, cells[:10])
+                print('%s size=%.2f: worldLoader matches BasicGridMap on all '
+                      '%d cells' % (world[0], size, gm.xN * gm.yN))
+    finally:
+        shutil.rmtree(cacheDir)
+
+class NumberTestSM(sm.SM):
+    """The number search problem from week 12's searchAlgorithms.py"""
+    startState = 1
+    legalInputs = ['x*2', 'x+1', 'x-1', 'x**2', '-x']
+    def __init__(self, goal):
+        self.goal = goal
+    def nextState(self, state, action):
+        if action == 'x*2':
+            return state*2
+        elif action == 'x+1':
+            return state+1
+        elif action == 'x-1':
+            return state-1
+        elif action == 'x**2':
+            return state**2
+        elif action == '-x':
+            return -state
+    def getNextValues(self, state, action):
+        nextState = self.nextState(state, action)
+        return (nextState, nextState)
+    def done(self, state):
+        return state == self.goal
+
+def numberPredecessors(s):
+    """
+    The predecessors of a state of NumberTestSM, which isn't reversible, found
+    by undoing each of the actions
+    """
+    result = [('x+1', s - 1), ('x-1', s + 1), ('-x', -s)]
+    if s % 2 == 0:
+        result.append(('x*2', s // 2))
+    if s >= 0:
+        root = math.isqrt(s)
+        if root * root == s:
+            result.append(('x**2', root))
+            if root != 0:
+                result.append(('x**2', -root))
+    return result
+
+def counted(f):
+    """Returns a version of f which counts how many times it is called"""
+    def g(*args):
+        g.calls += 1
+        return f(*args)
+    g.calls = 0
+    return g
+
+def benchmarkBidirectional(goals = (10, 100, 1000, 5000),
+                           world = planner.bigPlanWorld, sizes = (0.25, 0.1)):
+    """
+    Compares the number of states expanded and the time taken by breadth
+    first search against bidirectional search on NumberTestSM, and by uniform
+    cost search against bidirectional uniform cost search on a grid world
+    """
+    for goal in goals:
+        m = NumberTestSM(goal)
+        successor = counted(lambda s, a: m.getNextValues(s, a)[0])
+        (path, t) = timed(search.search, 1, m.done, m.legalInputs, successor,
+                          maxNodes = 10**7)
+        print('NumberTestSM(%d) search: %d steps, %d expansions, %.3fs' %
+              (goal, len(path) - 1, successor.calls / len(m.legalInputs), t))
+        successor = counted(lambda s, a: m.getNextValues(s, a)[0])
+        predecessors = counted(numberPredecessors)
+        (path, t) = timed(search.bidirectionalSearch, 1, goal, m.legalInputs,
+                          successor, predecessors, maxNodes = 10**7)
+        print('NumberTestSM(%d) bidirectional: %d steps, %d expansions, %.3fs'
+              % (goal, len(path) - 1, successor.calls / len(m.legalInputs) +
+                 predecessors.calls, t))
+    for size in sizes:
+        (gm, start, goal) = gridProblem(world, size)
+        dynamics = planner.GridDynamics(gm)
+        successors = counted(dynamics.successors)
+        (path, t) = timed(search.ucSearch, start, lambda s: s == goal,
+                          dynamics.legalInputs, dynamics.getNextValues,
+                          lambda s: 0, successors = successors)
+        print('%s size=%.2f ucSearch: %d expansions, %.3fs' %
+              (world[0], size, successors.calls, t))
+        successor = counted(dynamics.getNextValues)
+        predecessors = counted(dynamics.predecessors)
+        (path, t) = timed(search.bidirectionalUcSearch, start, goal,
+                          dynamics.legalInputs, successor, predecessors)
+        print('%s size=%.2f bidirectional: %d expansions, %.3fs' %
+              (world[0], size, successor.calls / len(dynamics.legalInputs) +
+               predecessors.calls, t))
+
+class RiverCrossingSM(sm.SM):
+    """
+    Week 12's FarmerGoatWolfCabbage, whose start and goal states are tuples
+    and whose other states are lists. Taking an item from the other bank, or
+    leaving the goat with the wolf or the cabbage, leaves the state as it is,
+    and each step has an output of 1 so it can also be searched by cost.
+    """
+    startState = ('L', 'L', 'L', 'L')
+    goal = ('R', 'R', 'R', 'R')
+    legalInputs = ['takeNone', 'takeGoat', 'takeWolf', 'takeCabbage']
+    def getNextValues(self, state, action):
+        item = self.legalInputs.index(action)
+        nextState = list(state)
+        if item != 0 and state[item] != state[0]:
+            return (nextState, 1)
+        nextState[0] = 'R' if state[0] == 'L' else 'L'
+        if item != 0:
+            nextState[item] = nextState[0]
+        (goat, wolf, cabbage) = nextState[1:]
+        if nextState[0] != goat and goat in (wolf, cabbage):
+            return (list(state), 1)
+        return (nextState, 1)
+
+def checkBidirectional():
+    """
+    Checks that bidirectional search, with and without costs, solves
+    RiverCrossingSM when its states are compared as tuples
+    """
+    m = RiverCrossingSM()
+    for uniformCost in (False, True):
+        path = search.bidirectionalSmSearch(m, uniformCost = uniformCost,
+                                            canonical = tuple)
+        assert path != None and len(path) - 1 == 7, \
+            'No 7 step solution found, uniformCost=%s' % uniformCost
+        assert tuple(path[-1][1]) == m.goal
+    print('RiverCrossingSM bidirectional: same solution with list states')
+
+class SlowNumberTestSM(NumberTestSM):
+    """
+    NumberTestSM with a deliberately costly step, which does some pointless
+    arithmetic, and an output of 1 so it can also be searched by cost
+    """
+    def __init__(self, goal, work = 20000):
+        NumberTestSM.__init__(self, goal)
+        self.work = work
+    def getNextValues(self, state, action):
+        sum(i * i for i in range(self.work))
+        return (self.nextState(state, action), 1)
+
+def benchmarkParallel(goals = (100, 1000), processesList = (1, 2, 4),
+                      work = 20000):
+    """
+    Times breadth first and uniform cost search on SlowNumberTestSM, one state
+    at a time and with the successors of each batch of states found over
+    pools of different numbers of processes
+    """
+    print('%d CPUs' % multiprocessing.cpu_count())
+    for goal in goals:
+        m = SlowNumberTestSM(goal, work)
+        (path, t) = timed(search.smSearch, m, maxNodes = 10**7)
+        print('SlowNumberTestSM(%d) smSearch: %d steps, %.3fs' %
+              (goal, len(path) - 1, t))
+        (path, t) = timed(search.ucSmSearch, m)
+        print('SlowNumberTestSM(%d) ucSmSearch: %d steps, %.3fs' %
+              (goal, len(path) - 1, t))
+        for processes in processesList:
+            with multiprocessing.Pool(processes) as pool:
+                (path, t) = timed(search.parallelSmSearch, m, pool,
+                                  maxNodes = 10**7)
+                print('SlowNumberTestSM(%d) parallelSmSearch, %d processes: '
+                      '%d steps, %.3fs' % (goal, processes, len(path) - 1, t))
+                (path, t) = timed(search.parallelSmSearch, m, pool,
+                                  uniformCost = True)
+                print('SlowNumberTestSM(%d) parallelSmSearch uniformCost, '
+                      '%d processes: %d steps, %.3fs' %
+                      (goal, processes, len(path) - 1, t))
+
+def benchmarkSearchStats(world = planner.bigPlanWorld, size = 0.1,
+                         goals = (100, 1000), jsonPath = None):
+    """
+    Prints the statistics collected by SearchStats for uniform cost search
+    and A* on a grid world, and for breadth first search with and without
+    dynamic programming on NumberTestSM. If jsonPath is given, all of the
+    statistics are also written to that file.
+    """
+    results = {}
+    def show(name, stats):
+        times = ', '.join('%s %.3fs' % item for item in stats.times.items())
+        print('%s: %d expanded, %d generated, %d pruned, branching %.2f, '
+              'peak agenda %d; %s' %
+              (name, stats.expanded, stats.generated, stats.pruned,
+               stats.branchingFactor(), stats.peakAgenda, times))
+        results[name] = stats.toDict()
+    (gm, start, goal) = gridProblem(world, size)
+    dynamics = planner.GridDynamics(gm)
+    for (name, heuristic) in (('ucSearch', lambda s: 0),
+                              ('A*', heuristics.octile(world[0], size,
+                                                       dynamics.grid, goal))):
+        stats = searchStats.SearchStats(bucketSize = 1)
+        search.ucSmSearch(dynamics, start, lambda s: s == goal, heuristic,
+                          stats = stats)
+        show('%s size=%.2f %s' % (world[0], size, name), stats)
+    for goal in goals:
+        for DP in (True, False):
+            stats = searchStats.SearchStats()
+            search.smSearch(NumberTestSM(goal), maxNodes = 10**6, DP = DP,
+                            stats = stats)
+            show('NumberTestSM(%d) smSearch DP=%s' % (goal, DP), stats)
+    if jsonPath != None:
+        with open(jsonPath, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+def benchmarkJumpPoints(world = planner.bigPlanWorld,
+                        sizes = (0.25, 0.1, 0.05)):
+    """
+    Compares the number of states expanded and the time taken by A* and by
+    Jump Point Search, both with the octile distance as the heuristic
+    """
+    for size in sizes:
+        (gm, start, goal) = gridProblem(world, size)
+        dynamics = planner.GridDynamics(gm)
+        heuristic = heuristics.octile(world[0], size, dynamics.grid, goal)
+        successors = counted(dynamics.successors)
+        (path, t) = timed(search.ucSearch, start, lambda s: s == goal,
+                          dynamics.legalInputs, dynamics.getNextValues,
+                          heuristic, successors = successors)
+        print('%s size=%.2f A*: %d expansions, %.3fs' %
+              (world[0], size, successors.calls, t))
+        report = {}
+        (path, t) = timed(jps.jumpPointSearch, dynamics.grid, start, goal,
+                          heuristic, report = report)
+        print('%s size=%.2f jumpPointSearch: %d expansions, %.3fs' %
+              (world[0], size, report['expansions'], t))
+
+def benchmarkSmoothing(worlds = (planner.bigPlanWorld, planner.mapTestWorld),
+                       sizes = (0.25, 0.1, 0.05)):
+    """
+    Compares the number of motion segments (runs of moves in one direction)
+    in the planner's path with the number of straight segments between the
+    waypoints after smoothing, along with the path lengths and the time taken
+    to smooth the path
+    """
+    for world in worlds:
+        for size in sizes:
+            (gm, start, goal) = gridProblem(world, size)
+            dynamics = planner.GridDynamics(gm)
+            path = search.ucSmSearch(dynamics, start, lambda s: s == goal,
+                                     heuristics.octile(world[0], size,
+                                                       dynamics.grid, goal))
+            actions = [a for (a, s) in path[1:]]
+            segments = sum(1 for (i, a) in enumerate(actions)
+                           if i == 0 or a != actions[i - 1])
+            length = sum(dynamics.getNextValues(s, a)[1]
+                         for ((x, s), (a, y)) in zip(path, path[1:]))
+            (waypoints, t) = timed(smoothing.smoothPath, dynamics.grid, path)
+            print('%s size=%.2f: %d moves in %d segments, length %.2f; '
+                  'smoothed to %d segments, length %.2f, in %.4fs' %
+                  (world[0], size, len(actions), segments, length,
+                   len(waypoints) - 1,
+                   smoothing.pathLength(dynamics.grid, waypoints), t))
+
+def benchmarkMemoryBounded(goals = (10, 50, 200), world = planner.mapTestWorld,
+                           maxNodesList = (1000, 200)):
+    """
+    Compares the number of nodes kept in memory and the time taken by uniform
+    cost search, IDA* and SMA* with a few node budgets, on NumberTestSM and on
+    a grid world. For uniform cost search, every node generated stays in
+    memory until it returns.
+    """
+    for goal in goals:
+        m = NumberTestSM(goal)
+        successor = counted(lambda s, a: (m.getNextValues(s, a)[0], 1))
+        (path, t) = timed(search.ucSearch, 1, m.done, m.legalInputs,
+                          successor, lambda s: 0)
+        print('NumberTestSM(%d) ucSearch: %d steps, %d nodes, %.3fs' %
+              (goal, len(path) - 1, successor.calls, t))
+        report = {}
+        (path, t) = timed(search.idaStarSearch, 1, m.done, m.legalInputs,
+                          successor, lambda s: 0, report = report)
+        print('NumberTestSM(%d) idaStarSearch: %d steps, peak %d nodes, %.3fs'
+              % (goal, len(path) - 1, report['peakNodes'], t))
+        for maxNodes in maxNodesList:
+            report = {}
+            (path, t) = timed(search.smaSearch, 1, m.done, m.legalInputs,
+                              successor, lambda s: 0, maxNodes = maxNodes,
+                              report = report)
+            print('NumberTestSM(%d) smaSearch(%d): %d steps, peak %d nodes, '
+                  '%.3fs' % (goal, maxNodes, len(path) - 1,
+                             report['peakNodes'], t))
+    (gm, start, goal) = gridProblem(world)
+    dynamics = planner.GridDynamics(gm)
+    heuristic = heuristics.octile(world[0], world[1], dynamics.grid, goal)
+    goalTest = lambda s: s == goal
+    successor = counted(dynamics.getNextValues)
+    (path, t) = timed(search.ucSearch, start, goalTest, dynamics.legalInputs,
+                      successor, heuristic)
+    print('%s ucSearch: %d nodes, %.3fs' % (world[0], successor.calls, t))
+    report = {}
+    (path, t) = timed(search.idaStarSearch, start, goalTest,
+                      dynamics.legalInputs, dynamics.getNextValues, heuristic,
+                      report = report)
+    print('%s idaStarSearch: peak %d nodes, %d expansions, %.3fs' %
+          (world[0], report['peakNodes'], report['expansions'], t))
+    for maxNodes in maxNodesList:
+        report = {}
+        (path, t) = timed(search.smaSearch, start, goalTest,
+                          dynamics.legalInputs, dynamics.getNextValues,
+                          heuristic, maxNodes = maxNodes, report = report)
+        print('%s smaSearch(%d): peak %d nodes, %d expansions, %.3fs' %
+              (world[0], maxNodes, report['peakNodes'],
+               report['expansions'], t))
+
+def randomGraph(seed, size = 28, branching = 3):
+    """
+    A random directed graph with size states and branching actions from each,
+    as (actions, successor), where successor returns (state, cost)
+    """
+    rng = random.Random(seed)
+    edges = [[(rng.randrange(size), rng.randint(1, 9))
+              for a in range(branching)] for s in range(size)]
+    return list(range(branching)), lambda s, a: edges[s][a]
+
+def pathCost(path, successor):
+    return sum(successor(s, a)[1] for ((ignore, s), (a, ignore2)) in
+               zip(path, path[1:]))
+
+def checkMemoryBounded(graphs = 200, budgets = (0, 1, 3, 10, 100)):
+    """
+    Checks smaSearch against ucSearch on random graphs: with a budget of at
+    least the number of states on the optimal path (that number plus each of
+    budgets) it has to find a path of the same cost, and with less, either
+    no path or one that fits
+    """
+    goal = 27
+    goalTest = lambda s: s == goal
+    checked = 0
+    for seed in range(graphs):
+        (actions, successor) = randomGraph(seed)
+        path = search.ucSearch(0, goalTest, actions, successor, lambda s: 0)
+        if path == None:
+            continue
+        for maxNodes in range(2, len(path)):
+            smaPath = search.smaSearch(0, goalTest, actions, successor,
+                                       lambda s: 0, maxNodes = maxNodes)
+            assert smaPath == None or len(smaPath) <= maxNodes
+        for extra in budgets:
+            smaPath = search.smaSearch(0, goalTest, actions, successor,
+                                       lambda s: 0,
+                                       maxNodes = len(path) + extra)
+            assert smaPath != None and \
+                pathCost(smaPath, successor) == pathCost(path, successor)
+            checked += 1
+    print('smaSearch matched ucSearch on %d searches' % checked)
+
+if __name__ == '__main__':
+    benchmarkAgenda()
+    benchmarkGridBackend()
+    benchmarkHeuristics()
+    benchmarkReplanning()
+    benchmarkBatch()
+    checkBatchPlanner()
+    benchmarkWorldLoading()
+    checkWorldLoading()
+    benchmarkBidirectional()
+    checkBidirectional()
+    benchmarkMemoryBounded()
+    checkMemoryBounded()
+    benchmarkParallel()
+    benchmarkSearchStats()
+    benchmarkJumpPoints()
+    benchmarkSmoothing()
@@ -0,0 +1,184 @@
+import math
+import search
+
+infinity = float('inf')
+# Keys closer than this are treated as equal, because rounding makes the same
+# cost come out slightly differently when it is summed along different paths
+epsilon = 1e-9
+
+class DStarLite:
+    """
+    An incremental planner for the grid world, using the D* Lite algorithm.
+    It searches backwards from the goal to the robot and keeps its cost
+    estimates between calls to plan(), so that when the robot moves or cells
+    change occupancy only the part of the search they affect is repaired.
+
+    Attributes:
+        g (dict): the cost of the shortest path to the goal found so far from
+            each cell; missing cells have an infinite cost
+        rhs (dict): one step lookahead values based on g; a cell is
+            consistent when its g and rhs values are equal
+    """
+    def __init__(self, dynamics, start, goal):
+        """
+        Args:
+            dynamics: a GridDynamics instance, whose occupancy grid is shared
+                with (and updated through) this planner
+            start: the indices of the robot's cell
+            goal: the indices of the goal cell
+        """
+        self.grid = dynamics.grid
+        self.start = start
+        self.goal = goal
+        # The heuristic is relative to the start, which moves with the robot;
+        # km makes up for the keys already in the agenda when it does
+        self.last = start
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.agenda = search.PQ()
+        self.agenda.push(goal, self.calculateKey(goal), goal)
+        # The neighbours of each cell, built on demand
+        self.neighbourTable = {}
+        # Number of cells expanded by computeShortestPath so far
+        self.expansions = 0
+
+    def heuristic(self, a, b):
+        """The octile distance between two cells"""
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        step = self.grid.stepSize
+        return step * (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy))
+
+    def calculateKey(self, s):
+        m = min(self.g.get(s, infinity), self.rhs.get(s, infinity))
+        return (m + self.heuristic(self.start, s) + self.km, m)
+
+    def neighbours(self, s):
+        """
+        Returns a list of (action, neighbour, cost, index) for every cell next
+        to s in the grid, whether or not it is blocked, where index is the
+        neighbour's index in the occupancy grid's cells. Every move costs the
+        same in both directions, so these are both the successors and the
+        predecessors of s.
+        """
+        result = self.neighbourTable.get(s)
+        if result == None:
+            (i, j) = s
+            grid = self.grid
+            result = [(a, (i + dx, j + dy), cost, grid.index(s) + offset)
+                      for (a, offset, dx, dy, cost) in grid.neighbours
+                      if 0 <= i + dx < grid.xN and 0 <= j + dy < grid.yN]
+            self.neighbourTable[s] = result
+        return result
+
+    def lookahead(self, s):
+        """
+        Returns the cost of the cheapest path to the goal from s through one of
+        its neighbours, which is infinite if s is blocked
+        """
+        cells = self.grid.cells
+        if s == self.goal:
+            return 0
+        if not cells[self.grid.index(s)]:
+            return infinity
+        g = self.g
+        best = infinity
+        for (a, n, cost, k) in self.neighbours(s):
+            if cells[k]:
+                best = min(best, cost + g.get(n, infinity))
+        return best
+
+    def updateVertex(self, s):
+        """Puts s on the agenda if it is inconsistent, with an up to date key"""
+        if self.agenda.contains(s):
+            self.agenda.remove(s)
+        if self.g.get(s, infinity) != self.rhs.get(s, infinity):
+            self.agenda.push(s, self.calculateKey(s), s)
+
+    def computeShortestPath(self):
+        g = self.g
+        rhs = self.rhs
+        cells = self.grid.cells
+        while not self.agenda.isEmpty():
+            (oldKey, s) = self.agenda.peek()
+            # Stop once the start is consistent and every cell left on the
+            # agenda is further from it than the goal, keeping cells that tie
+            # with the start so that the whole path comes out optimal
+            startKey = self.calculateKey(self.start)
+            if rhs.get(self.start, infinity) == g.get(self.start, infinity) \
+                and oldKey[0] > startKey[0] + epsilon:
+                break
+            newKey = self.calculateKey(s)
+            self.expansions += 1
+            if oldKey < newKey:
+                # The key is out of date because the robot has moved
+                self.agenda.remove(s)
+                self.agenda.push(s, newKey, s)
+            elif g.get(s, infinity) > rhs.get(s, infinity):
+                # Overconsistent: a cheaper path to the goal was found
+                g[s] = rhs[s]
+                self.agenda.remove(s)
+                if not cells[self.grid.index(s)]:
+                    continue
+                for (a, n, cost, k) in self.neighbours(s):
+                    if cells[k] and cost + g[s] < rhs.get(n, infinity):
+                        rhs[n] = cost + g[s]
+                        self.updateVertex(n)
+            else:
+                # Underconsistent: the old path got more expensive, so the
+                # cells whose lookahead went through s need it recomputed
+                oldG = g[s]
+                g[s] = infinity
+                for (a, n, cost, k) in self.neighbours(s):
+                    if rhs.get(n, infinity) == cost + oldG:
+                        rhs[n] = self.lookahead(n)
+                        self.updateVertex(n)
+                rhs[s] = self.lookahead(s)
+                self.updateVertex(s)
+
+    def updateCells(self, changes):
+        """
+        Changes the occupancy of some cells of the grid
+
+        Args:
+            changes: a list of ((i, j), free) pairs, where free is True if the
+                robot can now occupy the cell and False if it is now blocked
+        """
+        for (s, free) in changes:
+            if self.grid.setFree(s, free):
+                self.rhs[s] = self.lookahead(s)
+                self.updateVertex(s)
+                for (a, n, cost, k) in self.neighbours(s):
+                    self.rhs[n] = self.lookahead(n)
+                    self.updateVertex(n)
+
+    def plan(self, start = None):
+        """
+        Finds the shortest path from the robot's cell to the goal, repairing
+        the search from the previous call
+
+        Args:
+            start: the indices of the robot's cell, if it has moved
+
+        Returns:
+            a list of (action, state) pairs like the one from ucSearch, or None
+            if the goal can't be reached
+        """
+        if start != None and start != self.start:
+            self.km += self.heuristic(self.last, start)
+            self.last = start
+            self.start = start
+        self.computeShortestPath()
+        if self.g.get(self.start, infinity) == infinity:
+            return None
+        s = self.start
+        path = [(None, s)]
+        cells = self.grid.cells
+        # Each step must get strictly closer to the goal, so this ends
+        while s != self.goal:
+            (cost, a, s) = min([(cost + self.g.get(n, infinity), a, n)
+                                for (a, n, cost, k) in self.neighbours(s)
+                                if cells[k]])
+            path.append((a, s))
+        return path
@@ -0,0 +1,39 @@
+class ExpansionLog:
+    """
+    A class which records the states expanded by a search in a buffer, so that
+    they can be written out in bulk after the search finishes instead of one at
+    a time while it runs
+
+    Attributes:
+        states (list): the states recorded since the last flush, in order
+        write: a function which takes a list of states and writes them out, or
+            None to just keep them in states
+    """
+    def __init__(self, write = None):
+        self.states = []
+        self.write = write
+    def record(self, state):
+        self.states.append(state)
+    def flush(self):
+        """Writes out the buffered states, if there is a writer, and clears them"""
+        if self.write != None:
+            self.write(self.states)
+            self.states = []
+
+def drawing(gm, color = 'gray'):
+    """Returns a writer which draws each of the states on the grid map"""
+    def write(states):
+        for s in states:
+            gm.drawSquare(s, color)
+    return write
+
+def toFile(path):
+    """
+    Returns a writer which appends the states to a text file, one per line,
+    with the parts of each state separated by spaces
+    """
+    def write(states):
+        with open(path, 'a') as f:
+            f.write(''.join(' '.join(str(x) for x in s) + '\n'
+                            for s in states))
+    return write
@@ -0,0 +1,76 @@
+"""
+Heuristic providers for the grid planner. A provider is called as
+provider(worldPath, gridSquareSize, grid, goal), where grid is the
+OccupancyGrid of the map and goal is the indices of the goal cell, and returns
+a heuristic function which takes the indices of a cell and returns an estimate
+of the cost of getting from it to the goal.
+"""
+import collections
+import hashlib
+import heapq
+import math
+
+def octile(worldPath, gridSquareSize, grid, goal):
+    """
+    The octile distance to the goal, which is the exact cost of the shortest
+    path with eight moves on a grid without any obstacles
+    """
+    (goalX, goalY) = goal
+    step = grid.stepSize
+    extra = (math.sqrt(2) - 1) * step
+    def heuristic(s):
+        dx = abs(s[0] - goalX)
+        dy = abs(s[1] - goalY)
+        if dx > dy:
+            return step * dx + extra * dy
+        else:
+            return step * dy + extra * dx
+    return heuristic
+
+def distanceField(grid, goal):
+    """
+    Runs Dijkstra's algorithm backwards from the goal over the occupancy grid.
+    Every move costs the same in both directions, so this finds the cost of
+    the shortest path to the goal from every cell which can reach it.
+
+    Returns:
+        a dictionary mapping the indices of each cell which can reach the goal
+        to the cost of its shortest path to the goal
+    """
+    costs = {goal: 0}
+    agenda = [(0, goal)]
+    while agenda:
+        (cost, s) = heapq.heappop(agenda)
+        if cost > costs[s]:
+            # A cheaper path to s has already been expanded
+            continue
+        for (a, newS, stepCost) in grid.successors(s):
+            newCost = cost + stepCost
+            if newCost < costs.get(newS, float('inf')):
+                costs[newS] = newCost
+                heapq.heappush(agenda, (newCost, newS))
+    return costs
+
+# The most recently used distance fields, keyed by the contents of the grid
+# and the goal, so repeated queries to a goal on the same cells reuse them,
+# whichever grid object they come from, and a grid whose cells have changed
+# (e.g. by D* Lite) gets a new one
+distanceFields = collections.OrderedDict()
+maxDistanceFields = 16
+
+def exact(worldPath, gridSquareSize, grid, goal):
+    """
+    The exact cost of the shortest path to the goal, taking the obstacles into
+    account. Cells that can't reach the goal have an infinite cost.
+    """
+    key = (hashlib.sha1(grid.cells).digest(), grid.xN, grid.yN,
+           grid.stepSize, goal)
+    if key in distanceFields:
+        distanceFields.move_to_end(key)
+    else:
+        distanceFields[key] = distanceField(grid, goal)
+        if len(distanceFields) > maxDistanceFields:
+            distanceFields.popitem(last = False)
+    field = distanceFields[key]
+    infinity = float('inf')
+    return lambda s: field.get(s, infinity)
@@ -0,0 +1,151 @@
+import math
+import search
+import heuristics
+import occupancyGrid
+
+# The action for each (dx, dy) step
+actions = {(dx, dy): a for (a, dx, dy) in occupancyGrid.moves}
+
+def sign(x):
+    return (x > 0) - (x < 0)
+
+def jumpPointSearch(grid, start, goal, heuristic = None, log = None,
+                    report = None):
+    """
+    Jump Point Search (Harabor and Grastien) over an occupancy grid, with the
+    same moves and costs as GridDynamics, including diagonal moves past the
+    corners of blocked cells. Instead of adding every neighbour of a cell to
+    the agenda, it follows each direction in a straight line until it reaches
+    a cell where a shortest path might have to turn (a jump point), and only
+    adds that. The many paths of equal cost through open space are then
+    never expanded, but the path found is just as cheap as A*'s.
+
+    Args:
+        grid: an occupancyGrid.OccupancyGrid
+        start: the indices of the start cell
+        goal: the indices of the goal cell
+        heuristic: a function of the indices of a cell, by default the octile
+            distance to the goal
+        log: an expansionLog.ExpansionLog to record the expanded jump points
+            in, or None
+        report (dict): if given, it is filled in with the number of jump
+            points expanded ('expansions')
+
+    Returns:
+        a list of (action, state) pairs like the one from ucSearch, with one
+        pair for every cell along the path, or None
+    """
+    if heuristic == None:
+        heuristic = heuristics.octile(None, grid.stepSize, grid, goal)
+    cells = grid.cells
+    width = grid.width
+    goalK = grid.index(goal)
+    diagonal = math.sqrt(2) * grid.stepSize
+
+    def indices(k):
+        return (k // width - 1, k % width - 1)
+
+    def jump(k, dx, dy):
+        """
+        Steps from cell k in the direction (dx, dy) until it reaches the goal
+        or a cell with a neighbour that can't be reached as cheaply any other
+        way, and returns its index, or None if it reaches a blocked cell
+        """
+        step = dx * width + dy
+        while True:
+            k += step
+            if not cells[k]:
+                return None
+            if k == goalK:
+                return k
+            if dx and dy:
+                if (not cells[k - dx * width] and
+                    cells[k - dx * width + dy]) or \
+                    (not cells[k - dy] and cells[k + dx * width - dy]):
+                    return k
+                # A jump point in one of the straight directions makes this
+                # cell a jump point too, so the path can turn here
+                if jump(k, dx, 0) != None or jump(k, 0, dy) != None:
+                    return k
+            elif dx:
+                if (not cells[k + 1] and cells[k + step + 1]) or \
+                    (not cells[k - 1] and cells[k + step - 1]):
+                    return k
+            else:
+                if (not cells[k + width] and cells[k + step + width]) or \
+                    (not cells[k - width] and cells[k + step - width]):
+                    return k
+
+    def directions(k, parentK):
+        """
+        The directions to jump in from cell k, reached from parentK: the
+        direction of travel and the ones a blocked cell alongside forces
+        """
+        if parentK == None:
+            return [(dx, dy) for (a, dx, dy) in occupancyGrid.moves]
+        ((i, j), (pi, pj)) = (indices(k), indices(parentK))
+        (dx, dy) = (sign(i - pi), sign(j - pj))
+        if dx and dy:
+            result = [(dx, 0), (0, dy), (dx, dy)]
+            if not cells[k - dx * width]:
+                result.append((-dx, dy))
+            if not cells[k - dy]:
+                result.append((dx, -dy))
+        elif dx:
+            result = [(dx, 0)]
+            if not cells[k + 1]:
+                result.append((dx, 1))
+            if not cells[k - 1]:
+                result.append((dx, -1))
+        else:
+            result = [(0, dy)]
+            if not cells[k + width]:
+                result.append((1, dy))
+            if not cells[k - width]:
+                result.append((-1, dy))
+        return result
+
+    startK = grid.index(start)
+    g = {startK: 0}
+    parents = {startK: None}
+    expanded = set()
+    agenda = search.PQ()
+    agenda.push(startK, heuristic(start), startK)
+    expansions = 0
+    while not agenda.isEmpty():
+        k = agenda.pop()
+        if k == goalK:
+            break
+        expanded.add(k)
+        expansions += 1
+        if log != None:
+            log.record(indices(k))
+        (i, j) = indices(k)
+        for (dx, dy) in directions(k, parents[k]):
+            newK = jump(k, dx, dy)
+            if newK == None or newK in expanded:
+                continue
+            (newI, newJ) = indices(newK)
+            # Jump points are in a straight line from each other
+            steps = max(abs(newI - i), abs(newJ - j))
+            newG = g[k] + steps * (diagonal if dx and dy else grid.stepSize)
+            if newG < g.get(newK, float('inf')):
+                g[newK] = newG
+                parents[newK] = k
+                agenda.push(newK, newG + heuristic((newI, newJ)), newK)
+    if report != None:
+        report['expansions'] = expansions
+    if goalK not in parents:
+        return None
+    # Fills in the cells between the jump points
+    path = []
+    k = goalK
+    while parents[k] != None:
+        ((i, j), (pi, pj)) = (indices(k), indices(parents[k]))
+        (dx, dy) = (sign(i - pi), sign(j - pj))
+        for n in range(max(abs(i - pi), abs(j - pj)), 0, -1):
+            path.append((actions[(dx, dy)], (pi + n * dx, pj + n * dy)))
+        k = parents[k]
+    path.append((None, start))
+    path.reverse()
+    return path
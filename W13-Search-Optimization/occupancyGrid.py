@@ -0,0 +1,95 @@
+import math
+
+# The eight moves of the robot in the grid world, as (action, dx, dy) in the
+# same order as GridDynamics.legalInputs
+moves = [('u', 0, 1), ('ur', 1, 1), ('r', 1, 0), ('dr', 1, -1),
+         ('d', 0, -1), ('dl', -1, -1), ('l', -1, 0), ('ul', -1, 1)]
+
+class OccupancyGrid:
+    """
+    A class representing which cells of a grid map the robot can occupy. The
+    cells are stored in a flat bytearray with a border of blocked cells all the
+    way around, so a neighbour of any cell in the grid is always found by
+    adding a fixed offset to its index, without checking the bounds.
+
+    Attributes:
+        xN (int): number of cells in the x direction
+        yN (int): number of cells in the y direction
+        stepSize (float): the width of a cell, which is the cost of a straight
+            move; a diagonal move costs sqrt(2) times as much
+    """
+    def __init__(self, canOccupy, xN, yN, stepSize):
+        """
+        Args:
+            canOccupy: a function which takes the indices (i, j) of a cell and
+                returns True if the robot can occupy it
+        """
+        self.xN = xN
+        self.yN = yN
+        self.stepSize = stepSize
+        # Cell (i, j) is at index (i + 1) * width + j + 1
+        self.width = yN + 2
+        self.cells = bytearray((xN + 2) * self.width)
+        for i in range(xN):
+            for j in range(yN):
+                if canOccupy((i, j)):
+                    self.cells[self.index((i, j))] = 1
+        diagonal = math.sqrt(2) * stepSize
+        # (action, offset of the neighbour in cells, dx, dy, cost) for each move
+        self.neighbours = [(a, dx * self.width + dy, dx, dy,
+                            diagonal if dx and dy else stepSize)
+                           for (a, dx, dy) in moves]
+        # Successors of each cell that has been expanded, built on demand
+        self.successorTable = {}
+
+    def index(self, state):
+        return (state[0] + 1) * self.width + state[1] + 1
+
+    def canOccupy(self, state):
+        (i, j) = state
+        return 0 <= i < self.xN and 0 <= j < self.yN and \
+            self.cells[self.index(state)] == 1
+
+    def setFree(self, state, free):
+        """
+        Marks the cell with indices state as free (True) or blocked (False)
+
+        Returns:
+            True if that changed the cell
+        """
+        assert 0 <= state[0] < self.xN and 0 <= state[1] < self.yN, \
+            'Cell outside of the grid'
+        k = self.index(state)
+        if self.cells[k] == free:
+            return False
+        self.cells[k] = 1 if free else 0
+        # The successors of the cell and its neighbours may have changed
+        (i, j) = state
+        self.successorTable.pop(state, None)
+        for (a, offset, dx, dy, cost) in self.neighbours:
+            self.successorTable.pop((i + dx, j + dy), None)
+        return True
+
+    def successors(self, state):
+        """
+        Returns a list of (action, nextState, cost) for every move the robot
+        can make from the cell with indices state
+        """
+        result = self.successorTable.get(state)
+        if result == None:
+            (i, j) = state
+            k = self.index(state)
+            cells = self.cells
+            result = [(a, (i + dx, j + dy), cost)
+                      for (a, offset, dx, dy, cost) in self.neighbours
+                      if cells[k + offset]]
+            self.successorTable[state] = result
+        return result
+
+def fromMap(theMap):
+    """
+    Builds the occupancy grid of a grid map (e.g. a BasicGridMap), asking the
+    map once for each cell whether the robot can occupy it
+    """
+    return OccupancyGrid(theMap.robotCanOccupy, theMap.xN, theMap.yN,
+                         theMap.xStep)
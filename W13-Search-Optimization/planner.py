@@ -1,5 +1,10 @@
 import math
-import lib601.ucSearch as ucSearch
+import search
+import occupancyGrid
+import dStarLite
+import jps
+import smoothing
+import expansionLog
 import lib601.util as util
 import lib601.basicGridMap as basicGridMap
 import lib601.gridMap as gridMap
@@ -13,43 +18,23 @@ bigPlanWorld = ['bigPlanWorld.py', 0.25, util.Point(3.0, 1.0),
 class GridDynamics(sm.SM):
     """A state machine representing the robot’s dynamics in the grid world"""
     legalInputs = ['u', 'ur', 'r', 'dr', 'd', 'dl', 'l', 'ul']
+    # The change in the x and y indices for each action
+    moves = {a: (dx, dy) for (a, dx, dy) in occupancyGrid.moves}
+    opposites = {a: b for (a, dx, dy) in occupancyGrid.moves
+                 for (b, dx2, dy2) in occupancyGrid.moves
+                 if (dx, dy) == (-dx2, -dy2)}
     def __init__(self, theMap):
         self.map = theMap
         self.stepSize = self.map.xStep
+        self.grid = occupancyGrid.fromMap(theMap)
     def nextState(self,state,inp):
-        nextState = list(state)
-        sCost = self.stepSize
-        dCost = 2**(0.5)*self.stepSize
-        if inp == 'u':
-            nextState[1] += 1
-            cost = sCost
-        elif inp == 'ur':
-            nextState[0] += 1
-            nextState[1] += 1
-            cost = dCost
-        elif inp == 'r':
-            nextState[0] += 1
-            cost = sCost
-        elif inp == 'dr':
-            nextState[0] += 1
-            nextState[1] -= 1
-            cost = dCost
-        elif inp == 'd':
-            nextState[1] -= 1
-            cost = sCost
-        elif inp == 'dl':
-            nextState[0] -= 1
-            nextState[1] -= 1
-            cost = dCost
-        elif inp == 'l':
-            nextState[0] -= 1
-            cost = sCost
-        elif inp == 'ul':
-            nextState[0] -= 1
-            nextState[1] += 1
-            cost = dCost
-        nextState = tuple(nextState)
-        if self.map.robotCanOccupy(nextState):
+        (dx, dy) = self.moves[inp]
+        nextState = (state[0] + dx, state[1] + dy)
+        if dx and dy:
+            cost = 2**(0.5)*self.stepSize
+        else:
+            cost = self.stepSize
+        if self.grid.canOccupy(nextState):
             return (nextState, cost)
         else:
             return (state, 0)
@@ -59,6 +44,20 @@ class GridDynamics(sm.SM):
             return (state, 0)
         else:
             return self.nextState(state,inp)
+    def successors(self, state):
+        """
+        Returns a list of (action, nextState, cost) for all of the moves the
+        robot can make from state, in one call
+        """
+        return self.grid.successors(state)
+    def predecessors(self, state):
+        """
+        Returns a list of (action, previousState, cost) for all of the moves
+        the robot can make into state. Every move can be undone by the move in
+        the opposite direction, at the same cost.
+        """
+        return [(self.opposites[a], r, cost)
+                for (a, r, cost) in self.grid.successors(state)]
 
 class TestGridMap(gridMap.GridMap):
     def __init__(self, gridSquareSize):
@@ -95,10 +94,29 @@ def testGridDynamics():
     print('starting from (2, 3)', util.prettyString(ans4))
 
 
-def planner(initialPose, goalPoint, worldPath, gridSquareSize):
+def planner(initialPose, goalPoint, worldPath, gridSquareSize,
+            heuristicProvider = None, headless = False, log = None,
+            jumpPoints = False, smooth = False):
     """
     A planner method which implements A^* search to find optimal paths for the
     robot to move among states in the discrete map of the world
+
+    Args:
+        heuristicProvider: optionally, one of the providers in heuristics.py
+            (e.g. heuristics.exact) to use instead of the straight line
+            distance to the goal
+        headless (bool): if True, nothing is drawn or printed, so the planner
+            can run at full speed; the map and the path found are the same
+        log: an expansionLog.ExpansionLog to record the expanded states in,
+            which is flushed once the search finishes. If it is None and the
+            planner isn't headless, the expanded states are drawn in gray.
+        jumpPoints (bool): if True, Jump Point Search (jps.py) is used instead
+            of plain A*, which finds an equally cheap path while expanding far
+            fewer states
+        smooth (bool): if True, the path is shortened by smoothing.smoothPath
+            and the planner returns the list of the indices of its waypoints,
+            which the robot can drive between in straight lines, instead of
+            the (action, state) pairs for every cell
     """
     goalList = list(goalPoint.xyTuple())
     initialList = list(initialPose.xytTuple()[:2])
@@ -107,23 +125,64 @@ def planner(initialPose, goalPoint, worldPath, gridSquareSize):
     (initialX, initialY) = initialPose.xytTuple()[:2]
     iI = util.Point(initialX, initialY)
     initialIndices = gm.pointToIndices(iI)
-    def g(s):
-        gm.drawSquare(s, 'gray')
-        return s == goalIndices	# goalTest = lambda x: x == goalTuple)
+    if log == None and not headless:
+        log = expansionLog.ExpansionLog(expansionLog.drawing(gm, 'gray'))
+    if log == None:
+        g = lambda s: s == goalIndices
+    else:
+        # The goal test is called once for every expanded state
+        def g(s):
+            log.record(s)
+            return s == goalIndices
     def heuristic(s):
         return ((goalIndices[0] - s[0])**2 + (goalIndices[1] - s[1])**2)**(0.5)
-    path = ucSearch.smSearch(GridDynamics(gm), initialState = initialIndices,
-                goalTest = lambda x: g(x), heuristic = lambda x: heuristic(x))
-    print('path = ', path)
-    pathDrawing = []
-    for element in path:
-        loe = list(element)
-        pathDrawing.append(loe[1])
-    gm.drawPath(pathDrawing)
+    dynamics = GridDynamics(gm)
+    if heuristicProvider != None:
+        heuristic = heuristicProvider(worldPath, gridSquareSize,
+                                      dynamics.grid, goalIndices)
+    if jumpPoints:
+        path = jps.jumpPointSearch(dynamics.grid, initialIndices, goalIndices,
+                                   heuristic, log)
+    else:
+        path = search.ucSmSearch(dynamics, initialState = initialIndices,
+                    goalTest = g, heuristic = heuristic)
+    if log != None:
+        log.flush()
+    if smooth:
+        waypoints = smoothing.smoothPath(dynamics.grid, path)
+        if not headless:
+            print('waypoints = ', waypoints)
+            gm.drawPath(waypoints)
+        return waypoints
+    if not headless:
+        print('path = ', path)
+        pathDrawing = []
+        for element in path:
+            loe = list(element)
+            pathDrawing.append(loe[1])
+        gm.drawPath(pathDrawing)
     return path
 
+def incrementalPlanner(initialPose, goalPoint, worldPath, gridSquareSize):
+    """
+    Builds a D* Lite planner for the world, for robots which replan as they
+    move and observe new obstacles. Calling plan() on it again after changing
+    cells with updateCells() only repairs the part of the search that the
+    changes affect, instead of searching from scratch.
+
+    Returns:
+        the grid map and the planner
+    """
+    gm = basicGridMap.BasicGridMap(worldPath,gridSquareSize)
+    goalIndices = gm.pointToIndices(goalPoint)
+    (initialX, initialY) = initialPose.xytTuple()[:2]
+    initialIndices = gm.pointToIndices(util.Point(initialX, initialY))
+    return gm, dStarLite.DStarLite(GridDynamics(gm), initialIndices,
+                                   goalIndices)
+
 def testPlanner(world):
     (worldPath, gridSquareSize, goalPoint, initialPost) = world
     planner(initialPost, goalPoint, worldPath, gridSquareSize)		
-    
-testPlanner(bigPlanWorld)
\ No newline at end of file
+
+if __name__ == '__main__':
+    testPlanner(bigPlanWorld)
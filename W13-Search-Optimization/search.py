@@ -1,11 +1,67 @@
+import heapq
+from array import array
+from collections import deque
 import statemachine as sm
-import util as util 
+
+# The states on the path to each SearchNode are kept in a persistent hash
+# trie, which it shares with its parent's. A trie is a tuple of trieWidth
+# slots, indexed by trieBits bits of the hash at a time, each of which is
+# None, a TrieLeaf or another trie; adding a state only copies the tuples on
+# the way down to its slot.
+trieBits = 4
+trieWidth = 1 << trieBits
+hashMask = (1 << 64) - 1
+emptyTrie = (None,) * trieWidth
+
+class TrieLeaf:
+    """The states in a trie whose hashes are key"""
+    __slots__ = ('key', 'states')
+    def __init__(self, key, states):
+        self.key = key
+        self.states = states
+
+def trieAdd(trie, key, state, shift = 0):
+    """Returns a trie with the states in trie and state, whose hash is key"""
+    i = (key >> shift) & (trieWidth - 1)
+    slot = trie[i]
+    if slot == None:
+        slot = TrieLeaf(key, (state,))
+    elif type(slot) == TrieLeaf:
+        if slot.key == key:
+            if state in slot.states:
+                return trie
+            slot = TrieLeaf(key, slot.states + (state,))
+        else:
+            # The keys are told apart further down
+            below = list(emptyTrie)
+            below[(slot.key >> (shift + trieBits)) & (trieWidth - 1)] = slot
+            slot = trieAdd(tuple(below), key, state, shift + trieBits)
+    else:
+        slot = trieAdd(slot, key, state, shift + trieBits)
+    return trie[:i] + (slot,) + trie[i + 1:]
+
+def trieContains(trie, key, state):
+    """Whether state, whose hash is key, is in the trie"""
+    shift = 0
+    while True:
+        slot = trie[(key >> shift) & (trieWidth - 1)]
+        if slot == None:
+            return False
+        if type(slot) == TrieLeaf:
+            return slot.key == key and state in slot.states
+        trie = slot
+        shift += trieBits
 
 class SearchNode:
     """
-    A class representing a search node, extended to incorporate costs
+    A class representing a search node, extended to incorporate costs.
+
+    Besides its parent, each node keeps a trie of the states on the path from
+    the root to it, once inPath has been called on it, so that inPath doesn't
+    have to walk up the tree.
     """
-    def __init__(self, action, state, parent, actionCost):
+    __slots__ = ('state', 'action', 'parent', 'cost', 'trie')
+    def __init__(self, action, state, parent, actionCost = 0):
         self.state = state
         self.action = action
         self.parent = parent
@@ -13,6 +69,7 @@ class SearchNode:
             self.cost = self.parent.cost + actionCost
         else:
             self.cost = actionCost
+        self.trie = None
     
     def path(self):
         """
@@ -21,22 +78,53 @@ class SearchNode:
         tree, until it reaches a node whose parent is None.
         e.g. for D: ((None, 'S'), (1, 'B'), (1, 'D'))
         """
-        if self.parent == None:
-            return [(self.action, self.state)]
-        else:
-            return self.parent.path() + [(self.action, self.state)]
+        path = []
+        node = self
+        while node != None:
+            path.append((node.action, node.state))
+            node = node.parent
+        path.reverse()
+        return path
     
+    def pathTrie(self):
+        """
+        Returns the trie of the states on the path from the root to this
+        node, or False if one of them can't be hashed. It is built from the
+        nearest ancestor's the first time it is needed.
+        """
+        node = self
+        missing = []
+        while node != None and node.trie == None:
+            missing.append(node)
+            node = node.parent
+        trie = emptyTrie if node == None else node.trie
+        for node in reversed(missing):
+            if trie != False:
+                try:
+                    trie = trieAdd(trie, hash(node.state) & hashMask, node.state)
+                except TypeError:
+                    trie = False
+            node.trie = trie
+        return trie
+
     def inPath(self, s):
         """
         Takes a state, and returns True if the state occurs anywhere in the path
         from the root to the node.
         """
-        if s == self.state:
-            return True
-        elif self.parent == None:
-            return False
-        else:
-            return self.parent.inPath(s)
+        trie = self.pathTrie()
+        if trie != False:
+            try:
+                return trieContains(trie, hash(s) & hashMask, s)
+            except TypeError:
+                pass
+        # Paths with states that can't be hashed are searched one by one
+        node = self
+        while node != None:
+            if s == node.state:
+                return True
+            node = node.parent
+        return False
 
 map1 = {'S' : ['A', 'B'],
         'A' : ['S', 'C', 'D'],
@@ -74,77 +162,290 @@ class Stack:
         """
         return self.data.pop()
     def isEmpty(self):
-        return self.data is []
+        return len(self.data) == 0
+    def __len__(self):
+        return len(self.data)
 
 class Queue:
-    """A class representing queues as lists"""
+    """
+    A class representing queues as double-ended queues, so that items can be
+    popped off the front in constant time
+    """
     def __init__(self):
-        self.data = []
+        self.data = deque()
     def push(self, item):
         self.data.append(item)
     def pop(self):
         """
-        Pops items off of the front of the list, ensuring that the oldest items
+        Pops items off of the front of the queue, ensuring that the oldest items
         get popped off first.
         """
-        return self.data.pop(0)
+        return self.data.popleft()
     def isEmpty(self):
-        return self.data is []
+        return len(self.data) == 0
+    def __len__(self):
+        return len(self.data)
 
 class PQ:
     """
-    A class to model a priority queue
+    A class to model a priority queue as a binary heap. Items with equal cost
+    come out in the order they were pushed.
+
+    An item can be pushed with a key (e.g. its state). The queue then holds at
+    most one live entry per key: pushing the key again with a lower cost
+    replaces the old entry (decrease-key), and pushing it with a cost that is
+    no lower is ignored. Replaced entries are not removed from the heap, they
+    are marked as stale and skipped when they reach the top.
     """
+    removed = object()
     def __init__(self):
         self.data = []
-    def push(self, item, cost):
+        self.entries = {}
+        self.count = 0
+        self.live = 0
+    def push(self, item, cost, key = None):
+        """
+        Returns True if the item was added to the queue and False if an entry
+        with the same key and an equal or lower cost was already there.
+        """
+        if key is not None:
+            if key in self.entries:
+                if self.entries[key][0] <= cost:
+                    return False
+                self.remove(key)
+        # The counter breaks ties, so items themselves are never compared
+        entry = [cost, self.count, item, key]
+        self.count += 1
+        if key is not None:
+            self.entries[key] = entry
+        heapq.heappush(self.data, entry)
+        self.live += 1
+        return True
+    def remove(self, key):
+        """Marks the live entry with this key as stale"""
+        entry = self.entries.pop(key)
+        entry[2] = PQ.removed
+        self.live -= 1
+    def contains(self, key):
+        return key in self.entries
+    def peek(self):
+        """Returns (cost, item) for the cheapest item without popping it"""
+        while self.data[0][2] is PQ.removed:
+            heapq.heappop(self.data)
+        return (self.data[0][0], self.data[0][2])
+    def pop(self):
+        while self.data:
+            (cost, count, item, key) = heapq.heappop(self.data)
+            if item is not PQ.removed:
+                if key is not None:
+                    del self.entries[key]
+                self.live -= 1
+                return item # just return the data item
+        raise IndexError('pop from an empty priority queue')
+    def isEmpty(self):
+        return self.live == 0
+    def __len__(self):
+        return self.live
+
+class ListPQ:
+    """
+    A priority queue kept as a flat list, which is scanned for the cheapest
+    item on every pop. Kept to compare against PQ.
+    """
+    def __init__(self):
+        self.data = []
+    def push(self, item, cost, key = None):
         self.data.append((cost, item))
+        return True
     def pop(self):
-        (index, cost) = util.argmaxIndex(self.data, lambda x: -x[0])
+        index = min(range(len(self.data)), key = lambda i: self.data[i][0])
         return self.data.pop(index)[1] # just return the data item
     def isEmpty(self):
-        return self.data is []
+        return len(self.data) == 0
+    def __len__(self):
+        return len(self.data)
+
+class StateSet:
+    """
+    A set of states which can also hold states that can't be hashed, such as
+    lists, by keeping those in a list and checking them one by one. Searches
+    use plain sets until they find such a state, and StateSets after that.
+    """
+    def __init__(self, states = ()):
+        self.hashed = set()
+        self.unhashed = []
+        for s in states:
+            self.add(s)
+    def add(self, s):
+        try:
+            self.hashed.add(s)
+        except TypeError:
+            if s not in self.unhashed:
+                self.unhashed.append(s)
+    def __contains__(self, s):
+        try:
+            return s in self.hashed
+        except TypeError:
+            return s in self.unhashed
+    def __iter__(self):
+        yield from self.hashed
+        yield from self.unhashed
+    def __len__(self):
+        return len(self.hashed) + len(self.unhashed)
+
+def stateSet(states = ()):
+    """A set of the states, or a StateSet if some of them can't be hashed"""
+    try:
+        return set(states)
+    except TypeError:
+        return StateSet(states)
+
+class TranspositionTable:
+    """
+    A table of the states reached by a search, for dynamic programming on
+    states which can't be hashed (such as lists) or which have several
+    equivalent forms. Each state is passed through a canonicalization
+    function, and the result is interned as a small integer id, under which
+    the table keeps the lowest cost the state has been reached at.
+
+    Attributes:
+        ids (dict): the id of each canonical state, numbered from 0
+        costs (array): the lowest cost known for the state with each id
+    """
+    def __init__(self, canonical = None):
+        """
+        Args:
+            canonical: a function which takes a state and returns a hashable
+                state that stands for every state equivalent to it (e.g. tuple
+                for states that are lists), or None to use states as they are
+        """
+        self.canonical = canonical
+        self.ids = {}
+        self.costs = array('d')
+    def intern(self, state):
+        """Returns the id of the state, giving it a new one if it is new"""
+        if self.canonical != None:
+            state = self.canonical(state)
+        i = self.ids.get(state)
+        if i == None:
+            i = len(self.costs)
+            self.ids[state] = i
+            self.costs.append(float('inf'))
+        return i
+    def improve(self, i, cost):
+        """
+        Records cost for the state with id i, and returns True, if it is lower
+        than the lowest cost known for that state
+        """
+        if cost < self.costs[i]:
+            self.costs[i] = cost
+            return True
+        return False
+    def __len__(self):
+        return len(self.costs)
+
+def statsRecorders(stats):
+    """
+    Returns the functions search and ucSearch call to fill in stats: finish
+    with the path found, expand with each node as it is expanded and the size
+    of the agenda, and record after each expansion with the number of
+    successors generated and pruned and the size of the agenda
+    """
+    def record(generated, pruned, agendaSize):
+        stats.generated += generated
+        stats.pruned += pruned
+        stats.agenda(agendaSize)
+    return stats.finish, stats.expand, record
+
+# The same functions when there are no stats to fill in, so the searches
+# don't check for stats on every expansion
+noRecorders = (lambda path: path,
+               lambda node, agendaSize: None,
+               lambda generated, pruned, agendaSize: None)
 
 def search(initialState, goalTest, actions, successor,
-            depthFirst = False, DP = True, maxNodes = 10000):
+            depthFirst = False, DP = True, maxNodes = 10000, stats = None,
+            table = None):
     """
     Models either a Depth First Search or Breadth First Search algorithm with
     the option to use dynamic programming
+
+    Args:
+        table: a TranspositionTable to keep track of the states that have been
+            reached, by their canonical forms, instead of a set of the states
+            themselves; with dynamic programming, a state is then searched
+            again if it is reached by a shorter path
+        stats: a searchStats.SearchStats to fill in with statistics about the
+            search, or None; node costs are their depths
     """
     if depthFirst:
         agenda = Stack()
     else:
         agenda = Queue()
+    (push, pop) = (agenda.push, agenda.pop)
+    if stats != None:
+        goalTest = stats.timed('goalTest', goalTest)
+        successor = stats.timed('successor', successor)
+        push = stats.timed('agenda', push)
+        pop = stats.timed('agenda', pop)
+        stats.start()
+        (finish, expand, record) = statsRecorders(stats)
+    else:
+        (finish, expand, record) = noRecorders
     startNode = SearchNode(None, initialState, None)
     if goalTest(initialState):
-        return startNode.path()
-    agenda.push(startNode)
-    if DP: visited = {initialState: True}
+        return finish(startNode.path())
+    push(startNode)
+    # Sets of states, so that checking for a state takes constant time
+    if DP and table == None: visited = stateSet([initialState])
+    newSet = set
+    if table != None: table.improve(table.intern(initialState), 0)
     count = 1
     while not agenda.isEmpty() and maxNodes > count:
-        n = agenda.pop()
-        newStates = []
+        n = pop()
+        if DP and table != None and \
+            n.cost > table.costs[table.intern(n.state)]:
+            # A shorter path to this state was found after n was added
+            continue
+        expand(n, len(agenda))
+        newStates = newSet()
+        pruned = 0
         for a in actions:
             newS = successor(n.state, a)
-            newN = SearchNode(a, newS, n)
+            # Each step costs 1, so the cost of a node is its depth
+            newN = SearchNode(a, newS, n, 1)
+            # States are identified by their ids in the table, if there is one
+            key = newS if table == None else table.intern(newS)
             if goalTest(newS):
-                return newN.path()
-            elif newS in newStates:
-                pass
-            elif ((not DP) and n.inPath(newS)) or \
-                (DP and (newS in visited.keys())):
-                pass
+                record(len(newStates) + pruned + 1, pruned, len(agenda))
+                return finish(newN.path())
+            try:
+                seen = key in newStates or \
+                    (DP and table == None and newS in visited)
+            except TypeError:
+                # newS can't be hashed, so the sets can't hold it
+                newSet = StateSet
+                newStates = StateSet(newStates)
+                if DP and table == None: visited = StateSet(visited)
+                seen = key in newStates or \
+                    (DP and table == None and newS in visited)
+            if seen or ((not DP) and n.inPath(newS)) or \
+                (DP and table != None and not table.improve(key, newN.cost)):
+                pruned += 1
             else:
                 count += 1
-            if DP: visited[newS] = True
-            newStates.append(newS)
-            agenda.push(newN)
-    return None
+                if DP and table == None: visited.add(newS)
+                newStates.add(key)
+                push(newN)
+        record(len(newStates) + pruned, pruned, len(agenda))
+    return finish(None)
 
 def smSearch(smToSearch, initialState = None, goalTest = None, maxNodes = 10000,
-            depthFirst = False, DP = True):
+            depthFirst = False, DP = True, stats = None, table = None):
     """
-    Uses state machines as a representation of state-space search problems
+    Uses state machines as a representation of state-space search problems.
+    Machines whose states are lists can be searched as they are, but passing
+    a TranspositionTable(tuple) as the table lets the states be hashed.
     """
     if initialState == None:
         initialState = smToSearch.startState
@@ -154,37 +455,719 @@ def smSearch(smToSearch, initialState = None, goalTest = None, maxNodes = 10000,
                     # Just returns the next state instead of tuple
                     lambda s, a: smToSearch.getNextValues(s, a)[0],
                     maxNodes = maxNodes,
-                    depthFirst=depthFirst, DP=DP)
+                    depthFirst=depthFirst, DP=DP, stats=stats, table=table)
+
+def reversiblePredecessors(actions, successor, costs = False,
+                           canonical = None):
+    """
+    Returns a predecessor function for a reversible search space, where any
+    state r that s can be reached from in one step can also be reached from
+    s in one step. The predecessors of s are then found by trying every action
+    from each of the neighbours of s.
+
+    Args:
+        costs (bool): True if successor returns (newState, cost) pairs, as in
+            ucSearch, instead of just the new state
+        canonical: a function which turns a state into the canonical form
+            that states are compared by, as in bidirectionalSearch, or None
+
+    Returns:
+        a function which takes a state s and returns a list of (a, r) pairs,
+        or (a, r, cost) triples if costs is True, for every state r and action
+        a that leads from r to s
+    """
+    def nextState(s, a):
+        if costs:
+            return successor(s, a)[0]
+        return successor(s, a)
+    def same(r, s):
+        if canonical == None:
+            return r == s
+        return canonical(r) == canonical(s)
+    def predecessors(s):
+        result = []
+        for b in actions:
+            r = nextState(s, b)
+            if same(r, s):
+                continue
+            for a in actions:
+                if costs:
+                    (newS, cost) = successor(r, a)
+                    if same(newS, s) and (a, r, cost) not in result:
+                        result.append((a, r, cost))
+                elif same(nextState(r, a), s) and (a, r) not in result:
+                    result.append((a, r))
+        return result
+    return predecessors
+
+def joinPaths(meet, forward, backward, states = None):
+    """
+    Joins the paths found from each end of a bidirectional search where they
+    meet, into a list of (action, state) pairs like the one from search
+
+    Args:
+        forward (dict): maps each state reached from the start to the pair
+            (a, r) it was reached from, or None for the start
+        backward (dict): maps each state reached from the goal to the pair
+            (a, t) where action a leads from it to t, or None for the goal
+        states (dict): if forward and backward are keyed by the canonical
+            forms of the states, the state for each canonical form
+    """
+    if states == None:
+        states = {}
+    path = []
+    s = meet
+    while forward[s] != None:
+        (a, r) = forward[s]
+        path.append((a, states.get(s, s)))
+        s = r
+    path.append((None, states.get(s, s)))
+    path.reverse()
+    s = meet
+    while backward[s] != None:
+        (a, t) = backward[s]
+        path.append((a, states.get(t, t)))
+        s = t
+    return path
+
+def bidirectionalSearch(initialState, goalState, actions, successor,
+                        predecessors = None, maxNodes = 10000,
+                        canonical = None):
+    """
+    Breadth first search (with dynamic programming) forwards from the initial
+    state and backwards from the goal state at the same time, expanding a
+    whole layer of whichever side has the smaller frontier each time, until
+    the two meet in the middle. This visits roughly 2 * b^(d/2) states instead
+    of b^d.
+
+    Args:
+        predecessors: a function which takes a state s and returns a list of
+            (a, r) pairs such that successor(r, a) == s. By default the search
+            space is assumed to be reversible (see reversiblePredecessors).
+        canonical: a function which turns a state into a hashable canonical
+            form, such as tuple for states which are lists, or None to use
+            the states themselves; states with the same canonical form are
+            the same state to the search
+    """
+    if predecessors == None:
+        predecessors = reversiblePredecessors(actions, successor,
+                                              canonical = canonical)
+    # The visited states are kept by their canonical forms
+    (start, goal) = (initialState, goalState)
+    if canonical != None:
+        (start, goal) = (canonical(initialState), canonical(goalState))
+    if start == goal:
+        return [(None, initialState)]
+    states = {start: initialState, goal: goalState}
+    forward = {start: None}
+    backward = {goal: None}
+    # The distance of each state visited from its end of the search
+    forwardDepth = {start: 0}
+    backwardDepth = {goal: 0}
+    forwardLayer = [initialState]
+    backwardLayer = [goalState]
+    while forwardLayer and backwardLayer and \
+        len(forward) + len(backward) < maxNodes:
+        best = None
+        if len(forwardLayer) <= len(backwardLayer):
+            newLayer = []
+            for r in forwardLayer:
+                rKey = r if canonical == None else canonical(r)
+                for a in actions:
+                    s = successor(r, a)
+                    key = s if canonical == None else canonical(s)
+                    if key in forward:
+                        continue
+                    forward[key] = (a, rKey)
+                    forwardDepth[key] = forwardDepth[rKey] + 1
+                    states[key] = s
+                    newLayer.append(s)
+                    if key in backward:
+                        length = forwardDepth[key] + backwardDepth[key]
+                        if best == None or length < best[0]:
+                            best = (length, key)
+            forwardLayer = newLayer
+        else:
+            newLayer = []
+            for t in backwardLayer:
+                tKey = t if canonical == None else canonical(t)
+                for (a, s) in predecessors(t):
+                    key = s if canonical == None else canonical(s)
+                    if key in backward:
+                        continue
+                    backward[key] = (a, tKey)
+                    backwardDepth[key] = backwardDepth[tKey] + 1
+                    states[key] = s
+                    newLayer.append(s)
+                    if key in forward:
+                        length = forwardDepth[key] + backwardDepth[key]
+                        if best == None or length < best[0]:
+                            best = (length, key)
+            backwardLayer = newLayer
+        # Every meeting point is found within the same layer, so the best of
+        # them gives a shortest path
+        if best != None:
+            return joinPaths(best[1], forward, backward, states)
+    return None
+
+def bidirectionalUcSearch(initialState, goalState, actions, successor,
+                          predecessors = None, canonical = None):
+    """
+    Uniform cost search forwards from the initial state and backwards from
+    the goal state at the same time, expanding the side whose cheapest agenda
+    entry is cheaper each time. It stops once the cheapest entries on the two
+    sides together cost at least as much as the best path found so far.
+
+    Args:
+        successor: returns (newState, cost) pairs, as in ucSearch
+        predecessors: a function which takes a state s and returns a list of
+            (a, r, cost) triples such that successor(r, a) == (s, cost). By
+            default the search space is assumed to be reversible.
+        canonical: a function which turns a state into a hashable canonical
+            form, as in bidirectionalSearch, or None
+    """
+    if predecessors == None:
+        predecessors = reversiblePredecessors(actions, successor, costs = True,
+                                              canonical = canonical)
+    infinity = float('inf')
+    (start, goal) = (initialState, goalState)
+    if canonical != None:
+        (start, goal) = (canonical(initialState), canonical(goalState))
+    states = {start: initialState, goal: goalState}
+    # For each side, by the canonical forms of the states: the parents, the
+    # cheapest cost found to each state, the agenda and the expanded states
+    forward = ({start: None}, {start: 0}, PQ(), set())
+    backward = ({goal: None}, {goal: 0}, PQ(), set())
+    forward[2].push(initialState, 0, start)
+    backward[2].push(goalState, 0, goal)
+    bestCost = 0 if start == goal else infinity
+    meet = start
+    while not forward[2].isEmpty() and not backward[2].isEmpty():
+        forwardTop = forward[2].peek()[0]
+        backwardTop = backward[2].peek()[0]
+        if forwardTop + backwardTop >= bestCost:
+            break
+        if forwardTop <= backwardTop:
+            (parents, costs, agenda, expanded) = forward
+            otherCosts = backward[1]
+            neighbours = lambda s: [(a, newS, cost) for a in actions
+                                    for (newS, cost) in [successor(s, a)]]
+        else:
+            (parents, costs, agenda, expanded) = backward
+            otherCosts = forward[1]
+            neighbours = predecessors
+        s = agenda.pop()
+        sKey = s if canonical == None else canonical(s)
+        expanded.add(sKey)
+        for (a, newS, cost) in neighbours(s):
+            key = newS if canonical == None else canonical(newS)
+            if key in expanded:
+                continue
+            newCost = costs[sKey] + cost
+            if newCost < costs.get(key, infinity):
+                costs[key] = newCost
+                parents[key] = (a, sKey)
+                states[key] = newS
+                agenda.push(newS, newCost, key)
+                if key in otherCosts and \
+                    newCost + otherCosts[key] < bestCost:
+                    bestCost = newCost + otherCosts[key]
+                    meet = key
+    if bestCost == infinity:
+        return None
+    return joinPaths(meet, forward[0], backward[0], states)
+
+def bidirectionalSmSearch(smToSearch, initialState = None, goalState = None,
+                          predecessors = None, maxNodes = 10000,
+                          uniformCost = False, canonical = None):
+    """
+    Uses bidirectional search on a state machine with an explicit goal state,
+    by default its goal attribute. If no predecessor function is given, the
+    machine's predecessors method is used if it has one.
+
+    Args:
+        uniformCost (bool): if True, the machine's output on each step is the
+            cost of that step, and bidirectionalUcSearch is used
+        canonical: a function which turns a state into a hashable canonical
+            form, e.g. tuple for a machine whose states are lists, such as
+            week 12's FarmerGoatWolfCabbage (whose start and goal states are
+            tuples and whose other states are lists)
+    """
+    if initialState == None:
+        initialState = smToSearch.startState
+    if goalState == None:
+        goalState = smToSearch.goal
+    if predecessors == None and hasattr(smToSearch, 'predecessors'):
+        predecessors = smToSearch.predecessors
+    if uniformCost:
+        return bidirectionalUcSearch(initialState, goalState,
+                                     smToSearch.legalInputs,
+                                     smToSearch.getNextValues, predecessors,
+                                     canonical)
+    return bidirectionalSearch(initialState, goalState, smToSearch.legalInputs,
+                               # Just returns the next state instead of tuple
+                               lambda s, a: smToSearch.getNextValues(s, a)[0],
+                               predecessors, maxNodes, canonical)
 
-def ucSearch(initialState, goalTest, actions, successor, heuristic):
+def ucSearch(initialState, goalTest, actions, successor, heuristic,
+                agendaClass = PQ, successors = None, stats = None):
     """
     A method to implement a Uniform Cost search algorithm. Instead of testing
     for a goal state when we put an element into the agenda, we test for a goal
     state when we take an element out of the agenda to ensure that we actually
     find the shortest path to a goal state.
+
+    If successors is given, it is called once per expanded state and returns a
+    list of (action, newState, cost) for all of the actions from that state,
+    instead of calling successor for each action in turn.
+
+    If stats is given, it is a searchStats.SearchStats to fill in with
+    statistics about the search.
     """
+    if successors == None:
+        successors = lambda s: [(a,) + successor(s, a) for a in actions]
+    # The agenda is a priority queue
+    agenda = agendaClass()
+    (push, pop) = (agenda.push, agenda.pop)
+    if stats != None:
+        goalTest = stats.timed('goalTest', goalTest)
+        successors = stats.timed('successor', successors)
+        heuristic = stats.timed('heuristic', heuristic)
+        push = stats.timed('agenda', push)
+        pop = stats.timed('agenda', pop)
+        stats.start()
+        (finish, expand, record) = statsRecorders(stats)
+    else:
+        (finish, expand, record) = noRecorders
     startNode = SearchNode(None, initialState, None, 0)
     if goalTest(initialState):
-        return startNode.path()
-    # The agenda is a priority queue
-    agenda = PQ()
-    agenda.push(startNode, 0)
+        return finish(startNode.path())
+    push(startNode, 0, initialState)
     # Integrate dynamic programming; keep track of expanded nodes
-    expanded = {}
+    expanded = set()
     while not agenda.isEmpty():
-        n = agenda.pop()
+        n = pop()
         # Don't consider shortest paths we have already found
-        if n.state not in expanded.keys():
-            expanded[n.state] = True
+        if n.state not in expanded:
+            expanded.add(n.state)
+            expand(n, len(agenda))
             if goalTest(n.state):
-                return n.path()
-            for a in actions:
+                return finish(n.path())
+            newSuccessors = successors(n.state)
+            pruned = 0
+            for (a, newS, cost) in newSuccessors:
+                if newS not in expanded:
+                    newN = SearchNode(a, newS, n, cost)
+                    # Only keeps the cheapest node in the agenda for each state
+                    if not push(newN, newN.cost + heuristic(newS), newS):
+                        pruned += 1
+                else:
+                    pruned += 1
+            record(len(newSuccessors), pruned, len(agenda))
+    return finish(None)
+
+def ucSmSearch(smToSearch, initialState = None, goalTest = None,
+                heuristic = lambda s: 0, agendaClass = PQ, stats = None):
+    """
+    Uses uniform cost search on a state machine whose output on each step is
+    the cost of that step. If the machine has a successors method, it is used
+    to find all of the successors of a state at once.
+    """
+    if initialState == None:
+        initialState = smToSearch.startState
+    if goalTest == None:
+        goalTest = smToSearch.done
+    if hasattr(smToSearch, 'successors'):
+        successors = smToSearch.successors
+    else:
+        successors = None
+    return ucSearch(initialState, goalTest, smToSearch.legalInputs,
+                    smToSearch.getNextValues, heuristic,
+                    agendaClass = agendaClass, successors = successors,
+                    stats = stats)
+
+def idaStarSearch(initialState, goalTest, actions, successor, heuristic,
+                  maxExpansions = None, report = None):
+    """
+    Iterative deepening A* search. It runs a series of depth first searches,
+    each cut off at paths whose cost plus heuristic is over a bound, starting
+    with the heuristic of the initial state and raising the bound to the
+    smallest value that was cut off each time. Only the path being explored is
+    kept in memory, so memory grows with the depth of the solution rather than
+    with the number of nodes searched.
+
+    Args:
+        maxExpansions (int): the most nodes to expand before giving up, or
+            None to search until a goal is found
+        report (dict): if given, it is filled in with the number of nodes
+            expanded ('expansions') and the most nodes that were kept in
+            memory at once ('peakNodes')
+
+    Returns:
+        a list of (action, state) pairs like the one from ucSearch, or None
+    """
+    infinity = float('inf')
+    counts = {'expansions': 0, 'peakNodes': 1}
+    def boundedSearch(bound):
+        """
+        Searches depth first below the bound, and returns the path to a goal
+        (or None) and the smallest f value that was over the bound
+        """
+        nextBound = infinity
+        # Each entry is a node on the path being explored, and an iterator
+        # over the actions from it that haven't been tried yet
+        stack = [(SearchNode(None, initialState, None, 0), iter(actions))]
+        onPath = {initialState}
+        while stack:
+            (n, remaining) = stack[-1]
+            child = None
+            for a in remaining:
                 (newS, cost) = successor(n.state, a)
-                if newS not in expanded.keys():
+                if newS in onPath:
+                    continue
+                newN = SearchNode(a, newS, n, cost)
+                f = newN.cost + heuristic(newS)
+                if f > bound:
+                    nextBound = min(nextBound, f)
+                else:
+                    child = newN
+                    break
+            if child == None:
+                # Every action from n has been tried
+                stack.pop()
+                onPath.discard(n.state)
+            elif goalTest(child.state):
+                return child.path(), nextBound
+            elif maxExpansions != None and \
+                counts['expansions'] >= maxExpansions:
+                return None, infinity
+            else:
+                counts['expansions'] += 1
+                stack.append((child, iter(actions)))
+                onPath.add(child.state)
+                counts['peakNodes'] = max(counts['peakNodes'], len(stack))
+        return None, nextBound
+    path = None
+    if goalTest(initialState):
+        path = [(None, initialState)]
+    bound = heuristic(initialState)
+    while path == None and bound < infinity:
+        (path, bound) = boundedSearch(bound)
+    if report != None:
+        report.update(counts)
+    return path
+
+class MemoryNode(SearchNode):
+    """
+    A search node for smaSearch, which also keeps its f value, its depth, the
+    children of it that are in memory, and the f values of the children that
+    were forgotten to make room for other nodes, by state (None until it has
+    been expanded)
+    """
+    __slots__ = ('f', 'depth', 'children', 'forgotten')
+    def __init__(self, action, state, parent, actionCost = 0):
+        SearchNode.__init__(self, action, state, parent, actionCost)
+        self.f = 0
+        self.depth = parent.depth + 1 if parent else 0
+        self.children = []
+        self.forgotten = None
+
+    def bestForgotten(self):
+        """The lowest f value of the forgotten children, or infinity"""
+        return min(self.forgotten.values(), default = float('inf'))
+
+def smaSearch(initialState, goalTest, actions, successor, heuristic,
+              maxNodes = 10000, maxExpansions = None, report = None):
+    """
+    Simplified memory-bounded A* (SMA*) search. It works like A* until there
+    are maxNodes nodes in memory; after that, to make room for a new node it
+    forgets the leaf with the highest f value (the shallowest one if there is
+    a tie) and remembers that f value in the leaf's parent, so the forgotten
+    part of the tree is only generated again once everything else looks
+    worse. If the new node would itself be that leaf, it is forgotten straight
+    away instead. With an admissible heuristic the path found is optimal, as
+    long as an optimal path has at most maxNodes states on it; it only fails
+    to find a path when every path has more states than that.
+
+    Args:
+        maxNodes (int): the most search nodes to keep in memory at once
+        maxExpansions (int): the most nodes to expand before giving up, or
+            None to search until a goal is found or nothing is left
+        report (dict): if given, it is filled in with the number of nodes
+            expanded ('expansions') and the most nodes that were kept in
+            memory at once ('peakNodes')
+
+    Returns:
+        a list of (action, state) pairs like the one from ucSearch, or None
+    """
+    infinity = float('inf')
+    counts = {'expansions': 0, 'peakNodes': 1}
+    root = MemoryNode(None, initialState, None, 0)
+    root.f = heuristic(initialState)
+    # Nodes to expand: leaves that haven't been expanded, by their f value,
+    # and expanded nodes by the lowest f value of their forgotten children,
+    # deeper nodes first on ties
+    best = PQ()
+    best.push(root, (root.f, 0), root)
+    # Leaves other than the root, in the order they should be forgotten
+    worst = PQ()
+    nodes = 1
+
+    def requeue(n):
+        """Puts n back on the agendas after its children have changed"""
+        for agenda in (best, worst):
+            if agenda.contains(n):
+                agenda.remove(n)
+        f = n.f if n.forgotten == None else n.bestForgotten()
+        if f < infinity:
+            best.push(n, (f, -n.depth), n)
+        if not n.children and n.parent != None:
+            worst.push(n, (-n.f, n.depth), n)
+
+    def forget(leaf, expanding = None):
+        """
+        Removes a leaf from memory, remembering its f value in its parent,
+        which is put back on the agendas unless it is the node being expanded
+        """
+        nonlocal nodes
+        for agenda in (best, worst):
+            if agenda.contains(leaf):
+                agenda.remove(leaf)
+        nodes -= 1
+        parent = leaf.parent
+        parent.children.remove(leaf)
+        parent.forgotten[leaf.state] = leaf.f
+        if parent is not expanding:
+            requeue(parent)
+
+    def backup(n):
+        """Updates the f values of n and its ancestors from their children"""
+        while n != None:
+            f = min([c.f for c in n.children] + [n.bestForgotten()])
+            if f == n.f:
+                break
+            n.f = f
+            n = n.parent
+
+    while not best.isEmpty():
+        n = best.pop()
+        if worst.contains(n):
+            worst.remove(n)
+        if goalTest(n.state):
+            if report != None:
+                report.update(counts)
+            return n.path()
+        if maxExpansions != None and counts['expansions'] >= maxExpansions:
+            break
+        counts['expansions'] += 1
+        # The first time, generates all the children; after that only the
+        # forgotten ones which might still lead to a goal, starting from the
+        # f values they had when they were forgotten
+        if n.forgotten == None:
+            (regenerate, n.forgotten) = (None, {})
+        else:
+            regenerate = n.forgotten
+            n.forgotten = dict((s, f) for (s, f) in regenerate.items()
+                               if f == infinity)
+        newNodes = {}
+        for a in actions:
+            (newS, cost) = successor(n.state, a)
+            if regenerate == None:
+                if n.inPath(newS):
+                    continue
+                f = n.f
+            elif regenerate.get(newS, infinity) < infinity:
+                f = regenerate[newS]
+            else:
+                continue
+            newN = MemoryNode(a, newS, n, cost)
+            # A path one node longer than this wouldn't fit in memory, so
+            # there is no point keeping a node here unless it is a goal
+            if newN.depth >= maxNodes - 1 and not goalTest(newS):
+                continue
+            newN.f = max(f, newN.cost + heuristic(newS))
+            # Of several actions leading to the same state, only the
+            # cheapest matters
+            if newS not in newNodes or newN.cost < newNodes[newS].cost:
+                newNodes[newS] = newN
+        for c in sorted(newNodes.values(), key = lambda c: c.f):
+            if nodes >= maxNodes:
+                # The leaf to forget is the worst one, which may be one of
+                # c's siblings; n itself is off the agendas while it is being
+                # expanded, so it can't be forgotten under c
+                if worst.isEmpty() or worst.peek()[0] >= (-c.f, c.depth):
+                    # c would be the worst leaf
+                    n.forgotten[c.state] = c.f
+                    continue
+                forget(worst.peek()[1], n)
+            n.children.append(c)
+            nodes += 1
+            best.push(c, (c.f, -c.depth), c)
+            worst.push(c, (-c.f, c.depth), c)
+        counts['peakNodes'] = max(counts['peakNodes'], nodes)
+        backup(n)
+        if not n.children and n.f == infinity:
+            # A dead end
+            if n.parent == None:
+                break
+            forget(n)
+        else:
+            requeue(n)
+    if report != None:
+        report.update(counts)
+    return None
+
+class Expander:
+    """
+    A function which takes a state and returns a list of (action, result) for
+    every action, where result is what successor returns for that action. It
+    is a class rather than a closure so that it can be sent to the processes
+    of a multiprocessing pool, as long as successor can be (e.g. a function
+    defined at the top level of a module, or a method of such a class).
+    """
+    def __init__(self, actions, successor):
+        self.actions = actions
+        self.successor = successor
+    def __call__(self, state):
+        return [(a, self.successor(state, a)) for a in self.actions]
+
+class NextState:
+    """
+    A picklable version of lambda s, a: getNextValues(s, a)[0], which just
+    returns the next state instead of tuple
+    """
+    def __init__(self, getNextValues):
+        self.getNextValues = getNextValues
+    def __call__(self, s, a):
+        return self.getNextValues(s, a)[0]
+
+def parallelSearch(initialState, goalTest, actions, successor, pool,
+                   DP = True, maxNodes = 10000, batchSize = 64):
+    """
+    Breadth first search which takes up to batchSize nodes off the front of
+    the agenda at once and finds all of their successors with pool.map, then
+    goes through the results in the same order as search would. It returns
+    the same path as search does with depthFirst False, and is worth using
+    when calling successor takes much longer than sending states to the pool.
+
+    Args:
+        pool: anything with a map method, such as a multiprocessing.Pool, a
+            multiprocessing.pool.ThreadPool or a concurrent.futures executor;
+            for a pool of processes, successor must be picklable
+    """
+    expand = Expander(actions, successor)
+    agenda = Queue()
+    startNode = SearchNode(None, initialState, None)
+    if goalTest(initialState):
+        return startNode.path()
+    agenda.push(startNode)
+    if DP: visited = {initialState}
+    count = 1
+    while not agenda.isEmpty():
+        batch = []
+        while not agenda.isEmpty() and len(batch) < batchSize:
+            batch.append(agenda.pop())
+        results = pool.map(expand, [n.state for n in batch])
+        for (n, successors) in zip(batch, results):
+            if maxNodes <= count:
+                return None
+            newStates = set()
+            for (a, newS) in successors:
+                newN = SearchNode(a, newS, n)
+                if goalTest(newS):
+                    return newN.path()
+                elif newS in newStates:
+                    pass
+                elif ((not DP) and n.inPath(newS)) or \
+                    (DP and (newS in visited)):
+                    pass
+                else:
+                    count += 1
+                    if DP: visited.add(newS)
+                    newStates.add(newS)
+                    agenda.push(newN)
+    return None
+
+def parallelUcSearch(initialState, goalTest, actions, successor, heuristic,
+                     pool, batchSize = 64):
+    """
+    Uniform cost search which takes up to batchSize of the cheapest nodes off
+    the agenda at once and finds all of their successors with pool.map. The
+    nodes are then expanded in the order they were taken off, but once a
+    child cheaper than the next node has been added the rest of the batch is
+    put back on the agenda, with the successors already found kept for when
+    they come off again. So states are expanded in the same order as by
+    ucSearch, and the path found is just as cheap.
+
+    Args:
+        pool: anything with a map method, such as a multiprocessing.Pool, a
+            multiprocessing.pool.ThreadPool or a concurrent.futures executor;
+            for a pool of processes, successor must be picklable
+    """
+    expand = Expander(actions, successor)
+    startNode = SearchNode(None, initialState, None, 0)
+    if goalTest(initialState):
+        return startNode.path()
+    agenda = PQ()
+    agenda.push(startNode, 0, initialState)
+    expanded = set()
+    # Successors found and goal tests done for states which were put back on
+    # the agenda
+    found = {}
+    goals = {initialState: False}
+    while not agenda.isEmpty():
+        # (priority, node, is a goal) for each node in the batch
+        batch = []
+        while not agenda.isEmpty() and len(batch) < batchSize:
+            (priority, n) = agenda.peek()
+            agenda.pop()
+            if n.state not in expanded:
+                goal = goals.pop(n.state, None)
+                if goal == None:
+                    goal = goalTest(n.state)
+                batch.append((priority, n, goal))
+        # Goals aren't expanded, and neither are states with successors
+        # already found
+        states = [n.state for (priority, n, goal) in batch
+                  if not goal and n.state not in found]
+        found.update(zip(states, pool.map(expand, states)))
+        for (i, (priority, n, goal)) in enumerate(batch):
+            if not agenda.isEmpty() and agenda.peek()[0] < priority:
+                # A cheaper node was added by the nodes before this one
+                for (priority, n, goal) in batch[i:]:
+                    agenda.push(n, priority, n.state)
+                    goals[n.state] = goal
+                break
+            expanded.add(n.state)
+            if goal:
+                return n.path()
+            for (a, (newS, cost)) in found.pop(n.state):
+                if newS not in expanded:
                     newN = SearchNode(a, newS, n, cost)
-                    agenda.push(newN, newN.cost + heuristic(newS))   
+                    agenda.push(newN, newN.cost + heuristic(newS), newS)
     return None
 
+def parallelSmSearch(smToSearch, pool, initialState = None, goalTest = None,
+                     maxNodes = 10000, batchSize = 64, uniformCost = False,
+                     heuristic = lambda s: 0):
+    """
+    Uses parallelSearch on a state machine, or parallelUcSearch if
+    uniformCost is True, in which case the machine's output on each step is
+    the cost of that step. For a pool of processes, the machine must be
+    picklable.
+    """
+    if initialState == None:
+        initialState = smToSearch.startState
+    if goalTest == None:
+        goalTest = smToSearch.done
+    if uniformCost:
+        return parallelUcSearch(initialState, goalTest, smToSearch.legalInputs,
+                                smToSearch.getNextValues, heuristic, pool,
+                                batchSize)
+    return parallelSearch(initialState, goalTest, smToSearch.legalInputs,
+                          NextState(smToSearch.getNextValues), pool,
+                          maxNodes = maxNodes, batchSize = batchSize)
+
 def argmaxIndex(data, func):
     """
     Takes a list of items and a scoring function, and returns a pair consisting
@@ -200,4 +1183,4 @@ def argmaxIndex(data, func):
 
 l = [(5, 0), (8, 1), (3, 2)]
 func = lambda x: -x[0]
-argmaxIndex(l, func)
\ No newline at end of file
+argmaxIndex(l, func)
@@ -0,0 +1,111 @@
+import json
+import math
+import time
+
+class SearchStats:
+    """
+    A class which collects statistics about a run of search.search or
+    ucSearch, which fill it in when it is passed as their stats argument
+
+    Attributes:
+        generated (int): number of successor states found
+        expanded (int): number of nodes taken off the agenda and expanded
+        pruned (int): number of successor states that were dropped; by
+            search, because they had already been visited (or were on the
+            path, without dynamic programming), and by ucSearch, because they
+            had already been expanded or were on the agenda at a lower cost
+        peakAgenda (int): the most nodes that were on the agenda at once
+        times (dict): seconds spent in each phase of the search: calling
+            goalTest ('goalTest'), successor ('successor') and heuristic
+            ('heuristic'), and pushing to and popping from the agenda
+            ('agenda'), along with the whole search ('total')
+        costs (dict): a histogram of the costs of the expanded nodes, from the
+            lowest cost in each bucket to the number of nodes
+        history (list): (expanded, generated, agenda size, seconds) every
+            sampleEvery expansions, to follow the search over time
+        found (bool): whether a path was found
+    """
+    def __init__(self, bucketSize = 1, sampleEvery = 100, onExpand = None):
+        """
+        Args:
+            bucketSize (float): the width of the buckets of the cost histogram
+            sampleEvery (int): the number of expansions between samples in
+                history
+            onExpand: a function called with each node as it is expanded and
+                this object, or None
+        """
+        self.bucketSize = bucketSize
+        self.sampleEvery = sampleEvery
+        self.onExpand = onExpand
+        self.generated = 0
+        self.expanded = 0
+        self.pruned = 0
+        self.peakAgenda = 0
+        self.times = {'goalTest': 0, 'successor': 0, 'heuristic': 0,
+                      'agenda': 0, 'total': 0}
+        self.costs = {}
+        self.history = []
+        self.found = False
+        self.begin = None
+
+    def timed(self, phase, f):
+        """Returns a version of f which adds the time it takes to a phase"""
+        times = self.times
+        def timedF(*args):
+            start = time.perf_counter()
+            result = f(*args)
+            times[phase] += time.perf_counter() - start
+            return result
+        return timedF
+
+    def start(self):
+        self.begin = time.perf_counter()
+
+    def expand(self, node, agendaSize):
+        """
+        Records that node is being expanded, with agendaSize nodes left on
+        the agenda
+        """
+        self.expanded += 1
+        bucket = math.floor(node.cost / self.bucketSize) * self.bucketSize
+        self.costs[bucket] = self.costs.get(bucket, 0) + 1
+        self.agenda(agendaSize)
+        if self.expanded % self.sampleEvery == 0:
+            self.history.append((self.expanded, self.generated, agendaSize,
+                                 time.perf_counter() - self.begin))
+        if self.onExpand != None:
+            self.onExpand(node, self)
+
+    def agenda(self, size):
+        self.peakAgenda = max(self.peakAgenda, size)
+
+    def finish(self, path):
+        """Records the end of the search, which returned path"""
+        self.times['total'] += time.perf_counter() - self.begin
+        self.found = path != None
+        return path
+
+    def branchingFactor(self):
+        """The average number of nodes generated per expansion"""
+        return self.generated / self.expanded if self.expanded else 0
+
+    def toDict(self):
+        return {'generated': self.generated,
+                'expanded': self.expanded,
+                'pruned': self.pruned,
+                'branchingFactor': self.branchingFactor(),
+                'peakAgenda': self.peakAgenda,
+                'times': self.times,
+                # JSON keys have to be strings
+                'costs': dict((str(c), n) for (c, n) in
+                              sorted(self.costs.items())),
+                'history': self.history,
+                'found': self.found}
+
+    def toJSON(self, indent = None):
+        return json.dumps(self.toDict(), indent = indent)
+
+    def dump(self, path):
+        """Writes the statistics to a JSON file"""
+        with open(path, 'w') as f:
+            f.write(self.toJSON(indent = 2))
@@ -0,0 +1,73 @@
+import math
+
+def lineOfSight(grid, a, b):
+    """
+    Returns True if the robot can move in a straight line from the centre of
+    cell a to the centre of cell b, that is if every cell the line passes
+    through is free. Where the line passes exactly through the corner of a
+    cell it moves diagonally, which like GridDynamics doesn't need the cells
+    on either side of the corner to be free.
+    """
+    cells = grid.cells
+    k = grid.index(a)
+    (di, dj) = (b[0] - a[0], b[1] - a[1])
+    stepI = grid.width if di > 0 else -grid.width
+    stepJ = 1 if dj > 0 else -1
+    (ni, nj) = (abs(di), abs(dj))
+    # The number of cell boundaries crossed in each direction so far
+    (x, y) = (0, 0)
+    while x < ni or y < nj:
+        # The next boundaries are crossed at (2x + 1) / 2ni and (2y + 1) / 2nj
+        # of the way along the line; multiplying both by 2 ni nj keeps them
+        # exact integers
+        (tX, tY) = ((2 * x + 1) * nj, (2 * y + 1) * ni)
+        if y == nj or (x < ni and tX < tY):
+            x += 1
+            k += stepI
+        elif x == ni or tY < tX:
+            y += 1
+            k += stepJ
+        else:
+            x += 1
+            y += 1
+            k += stepI + stepJ
+        if not cells[k]:
+            return False
+    return True
+
+def smoothPath(grid, path):
+    """
+    Shortens a path from the planner by cutting out every cell it can: from
+    each waypoint, it goes straight to the furthest cell along the path that
+    it can see, which becomes the next waypoint
+
+    Args:
+        grid: the occupancyGrid.OccupancyGrid the path was planned on
+        path: a list of (action, state) pairs like the one from ucSearch
+
+    Returns:
+        a list of the indices of the waypoints, starting with the first cell
+        of the path and ending with the last, or None if path is None
+    """
+    if path == None:
+        return None
+    states = [s for (a, s) in path]
+    waypoints = [states[0]]
+    i = 0
+    while i < len(states) - 1:
+        j = i + 1
+        while j + 1 < len(states) and lineOfSight(grid, states[i],
+                                                  states[j + 1]):
+            j += 1
+        waypoints.append(states[j])
+        i = j
+    return waypoints
+
+def pathLength(grid, waypoints):
+    """The length of the straight lines between the centres of the waypoints"""
+    return grid.stepSize * sum(math.hypot(b[0] - a[0], b[1] - a[1])
+                               for (a, b) in zip(waypoints, waypoints[1:]))
+
+def toPoints(gm, waypoints):
+    """Returns the centre of each waypoint as a util.Point in the grid map"""
+    return [gm.indicesToPoint(s) for s in waypoints]
@@ -0,0 +1,127 @@
+"""
+Loads the grid maps of world files such as bigPlanWorld.py, caching which
+cells the robot can occupy on disk so that later loads don't have to build a
+BasicGridMap again. The cells come from BasicGridMap.robotCanOccupy itself, so
+a WorldGrid blocks exactly the same cells as the BasicGridMap of its world.
+"""
+import hashlib
+import math
+import os
+import struct
+import lib601.util as util
+import lib601.basicGridMap as basicGridMap
+
+class WorldGrid:
+    """
+    A grid map of a world file which doesn't need a window, with the same
+    methods and cells that the planner uses from a BasicGridMap
+
+    Attributes:
+        free (bytearray): 1 for each cell the robot can occupy and 0 for the
+            others, with cell (i, j) at index i * yN + j
+    """
+    def __init__(self, xMin, yMin, xN, yN, xStep, yStep, free):
+        self.xMin = xMin
+        self.yMin = yMin
+        self.xN = xN
+        self.yN = yN
+        self.xStep = xStep
+        self.yStep = yStep
+        self.free = free
+    def pointToIndices(self, p):
+        i = int(math.floor((p.x - self.xMin) / self.xStep))
+        j = int(math.floor((p.y - self.yMin) / self.yStep))
+        return (util.clip(i, 0, self.xN - 1), util.clip(j, 0, self.yN - 1))
+    def indicesToPoint(self, indices):
+        return util.Point(self.xMin + (indices[0] + 0.5) * self.xStep,
+                          self.yMin + (indices[1] + 0.5) * self.yStep)
+    def robotCanOccupy(self, indices):
+        (i, j) = indices
+        return 0 <= i < self.xN and 0 <= j < self.yN and \
+            self.free[i * self.yN + j] == 1
+
+def fromGridMap(gm):
+    """Returns a WorldGrid with the cells of a grid map, e.g. a BasicGridMap"""
+    free = bytearray(gm.xN * gm.yN)
+    for i in range(gm.xN):
+        for j in range(gm.yN):
+            if gm.robotCanOccupy((i, j)):
+                free[i * gm.yN + j] = 1
+    return WorldGrid(gm.xMin, gm.yMin, gm.xN, gm.yN, gm.xStep, gm.yStep, free)
+
+def differences(grid, gridMap):
+    """
+    Returns a list of the indices of the cells which one of grid (a
+    WorldGrid) and gridMap (e.g. a BasicGridMap of the same world) says the
+    robot can occupy and the other doesn't
+    """
+    assert (grid.xN, grid.yN) == (gridMap.xN, gridMap.yN), \
+        'The grids are different sizes'
+    return [(i, j) for i in range(grid.xN) for j in range(grid.yN)
+            if grid.robotCanOccupy((i, j)) != gridMap.robotCanOccupy((i, j))]
+
+def packBits(cells):
+    """
+    Packs a bytearray of 0s and 1s into a bytes object with one bit per cell,
+    the first cell in the lowest bit
+    """
+    digits = bytes(cells).translate(bytes.maketrans(b'\x00\x01', b'01'))
+    return int(digits[::-1] or b'0', 2).to_bytes((len(cells) + 7) // 8,
+                                                   'little')
+
+def unpackBits(bits, n):
+    """Unpacks the first n cells packed by packBits into a bytearray"""
+    digits = format(int.from_bytes(bits, 'little'), 'b').zfill(n)[::-1]
+    return bytearray(digits[:n].encode().translate(
+        bytes.maketrans(b'01', b'\x00\x01')))
+
+# The header of a cached grid: a version tag, xN, yN, xMin, yMin, xStep and
+# yStep
+cacheHeader = struct.Struct('<4sIIdddd')
+cacheVersion = b'WGR2'
+
+# Grids that have already been loaded in this process
+loaded = {}
+
+def load(worldPath, gridSquareSize, cacheDir = None):
+    """
+    Loads the grid map of a world file. The cells of each grid are found
+    once, from a BasicGridMap of the world, and cached on disk in cacheDir
+    (by default, .gridCache next to the world file) keyed by a hash of the
+    file and the resolution, so later loads just read the cached cells back.
+
+    Returns:
+        a WorldGrid
+    """
+    with open(worldPath, 'rb') as f:
+        text = f.read()
+    key = hashlib.sha1(text + repr(gridSquareSize).encode() + cacheVersion)
+    key = key.hexdigest()
+    if key in loaded:
+        return loaded[key]
+    if cacheDir == None:
+        cacheDir = os.path.join(os.path.dirname(os.path.abspath(worldPath)),
+                                '.gridCache')
+    cachePath = os.path.join(cacheDir, key + '.grid')
+    if os.path.exists(cachePath):
+        with open(cachePath, 'rb') as f:
+            data = f.read()
+        (version, xN, yN, xMin, yMin, xStep, yStep) = \
+            cacheHeader.unpack_from(data)
+        assert version == cacheVersion, 'Unknown grid cache version'
+        free = unpackBits(data[cacheHeader.size:], xN * yN)
+        grid = WorldGrid(xMin, yMin, xN, yN, xStep, yStep, free)
+    else:
+        grid = fromGridMap(basicGridMap.BasicGridMap(worldPath,
+                                                     gridSquareSize))
+        os.makedirs(cacheDir, exist_ok = True)
+        # Written to a temporary file first, so that a half written cache
+        # file is never read
+        with open(cachePath + '.tmp', 'wb') as f:
+            f.write(cacheHeader.pack(cacheVersion, grid.xN, grid.yN,
+                                     grid.xMin, grid.yMin, grid.xStep,
+                                     grid.yStep))
+            f.write(packBits(grid.free))
+        os.replace(cachePath + '.tmp', cachePath)
+    loaded[key] = grid
+    return grid